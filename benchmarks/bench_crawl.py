@@ -0,0 +1,203 @@
+"""Benchmark de bout en bout du crawl, hors ligne, contre le serveur de benchmarks/fixture_server.py.
+
+Chaque scénario est lancé dans un processus à part, pour que le pic de mémoire (RSS) et le temps CPU
+mesurés ne concernent que lui. Les résultats sont comparés à un fichier de référence
+(benchmarks/baseline.json par défaut) et toute régression au-delà de la tolérance est signalée.
+
+    python benchmarks/bench_crawl.py                    # compare à la référence
+    python benchmarks/bench_crawl.py --update-baseline  # enregistre la nouvelle référence
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+# --- même astuce que dans scraper/book_category_scraper pour importer depuis la racine du projet --- #
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+from fixture_server import Catalogue, free_port, serve
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Arguments de book_scraper.main pour les scénarios de bout en bout (le cache HTTP fausserait la mesure)
+CRAWL_SCENARIOS = {
+    'crawl-sequential': ['--no-http-cache'],
+    'crawl-workers-8': ['--no-http-cache', '--workers', '8'],
+    'crawl-pipeline': ['--no-http-cache', '--pipeline'],
+    'crawl-pipeline-bounded': ['--no-http-cache', '--pipeline', '--max-inflight-mb', '0.1'],
+}
+SCENARIOS = [*CRAWL_SCENARIOS, 'scrape_book_data', 'get_book_urls_from_page']
+
+# Sens de chaque mesure : True si une valeur plus grande est meilleure
+METRICS = {'pages_per_sec': True, 'mb_per_sec': True, 'peak_rss_mb': False, 'cpu_seconds': False}
+
+
+def run_scenario(name, base_url, site):
+    """Exécute un scénario dans le processus courant (appelé dans un processus enfant).
+
+    Args:
+        name (str): Nom du scénario.
+        base_url (str): URL du serveur de fixtures.
+        site (dict): Options du catalogue servi (categories, books, seed), pour retrouver ses URL.
+
+    Returns:
+        float: Durée du scénario en secondes.
+    """
+    catalogue = Catalogue(**site)
+    start = time.perf_counter()
+    if name in CRAWL_SCENARIOS:
+        import book_scraper
+        book_scraper.main(['--base-url', base_url, *CRAWL_SCENARIOS[name]])
+    elif name == 'scrape_book_data':
+        from scraper.book_details_scraper.single_book_scraper import scrape_book_data
+        for book_slug in catalogue.books:
+            scrape_book_data(f'{base_url}catalogue/{book_slug}/index.html')
+    elif name == 'get_book_urls_from_page':
+        from scraper.book_category_scraper.category_scraper import get_book_urls_from_page
+        for _, slug, _ in catalogue.categories:
+            get_book_urls_from_page(f'{base_url}catalogue/category/books/{slug}/index.html', [])
+    else:
+        raise ValueError(f'Unknown scenario: {name}')
+    return time.perf_counter() - start
+
+
+def child_main(name, base_url, site):
+    """Point d'entrée du processus enfant : lance le scénario dans un dossier temporaire et affiche ses mesures en JSON."""
+    with tempfile.TemporaryDirectory(prefix='bench-crawl-') as work_dir:
+        os.chdir(work_dir)
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        # Les scripts affichent une ligne par livre : la sortie est ignorée pour ne pas mesurer le terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = run_scenario(name, base_url, site)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_seconds = (usage.ru_utime + usage.ru_stime) - (usage_before.ru_utime + usage_before.ru_stime)
+    # ru_maxrss est en Ko sous Linux et en octets sous macOS
+    peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    print(json.dumps({'elapsed': elapsed, 'cpu_seconds': cpu_seconds, 'peak_rss_mb': peak_rss / 1e6}))
+
+
+def measure_once(name, base_url, site):
+    """Lance un scénario dans un processus enfant et retourne ses mesures, avec le trafic vu par le serveur."""
+    requests.get(base_url + '__reset')
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, '--base-url', base_url, '--site', json.dumps(site)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT_DIR).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    stats = requests.get(base_url + '__stats').json()
+    elapsed = result.pop('elapsed')
+    return {
+        'pages_per_sec': stats['pages'] / elapsed,
+        'mb_per_sec': stats['bytes_sent'] / 1e6 / elapsed,
+        'elapsed': elapsed,
+        'requests': stats['requests'],
+        **result,
+    }
+
+
+def measure(name, base_url, site, repeat):
+    """Lance un scénario repeat fois et retourne la médiane de chaque mesure."""
+    runs = [measure_once(name, base_url, site) for _ in range(repeat)]
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def compare(results, baseline, tolerance):
+    """Retourne la liste des régressions de results par rapport à baseline, au-delà de la tolérance relative."""
+    regressions = []
+    for scenario, measures in results.items():
+        reference = baseline.get(scenario)
+        if reference is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if not reference.get(metric):
+                continue
+            ratio = measures[metric] / reference[metric]
+            if (ratio < 1 - tolerance) if higher_is_better else (ratio > 1 + tolerance):
+                regressions.append(f'{scenario}: {metric} {reference[metric]:.2f} -> {measures[metric]:.2f} ({ratio - 1:+.0%})')
+    return regressions
+
+
+def main(argv=None):
+    """Démarre le serveur de fixtures, mesure chaque scénario et compare les résultats à la référence."""
+    parser = argparse.ArgumentParser(description='Benchmark de bout en bout du crawl contre un serveur local.')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scénario à lancer (plusieurs possibles). Par défaut, tous.')
+    parser.add_argument('--categories', type=int, default=5, help='Nombre de catégories du site servi.')
+    parser.add_argument('--books', type=int, default=200, help='Nombre de livres du site servi.')
+    parser.add_argument('--latency', type=float, default=0.005, help='Latence de chaque réponse, en secondes.')
+    parser.add_argument('--jitter', type=float, default=0.002, help='Écart aléatoire maximal autour de la latence, en secondes.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilité que le serveur réponde 503.')
+    parser.add_argument('--repeat', type=int, default=3, help='Nombre de mesures de chaque scénario, dont la médiane est retenue.')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Fichier de référence des résultats.')
+    parser.add_argument('--update-baseline', action='store_true', help='Enregistre les résultats comme nouvelle référence.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Écart relatif toléré avant de signaler une régression.')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--site', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child_main(args.child, args.base_url, json.loads(args.site))
+
+    site = {'categories': args.categories, 'books': args.books, 'seed': 0}
+    port = free_port()
+    server = multiprocessing.Process(target=serve, args=(port, args.latency, args.jitter, args.error_rate), kwargs=site, daemon=True)
+    server.start()
+    base_url = f'http://127.0.0.1:{port}/'
+    for _ in range(100):
+        try:
+            requests.get(base_url + '__stats')
+            break
+        except requests.ConnectionError:
+            time.sleep(0.05)
+
+    results = {}
+    try:
+        print(f"{args.books} livres, {args.categories} catégories, latence {args.latency * 1000:.0f} ms ± {args.jitter * 1000:.0f} ms, erreurs {args.error_rate:.0%}")
+        print(f"{'scenario':<26}{'pages/sec':>10}{'MB/sec':>9}{'peak RSS MB':>13}{'CPU s':>8}{'wall s':>8}")
+        for name in args.scenario or SCENARIOS:
+            results[name] = measure(name, base_url, site, args.repeat)
+            r = results[name]
+            print(f"{name:<26}{r['pages_per_sec']:>10.1f}{r['mb_per_sec']:>9.2f}{r['peak_rss_mb']:>13.1f}{r['cpu_seconds']:>8.2f}{r['elapsed']:>8.2f}")
+    finally:
+        server.terminate()
+
+    # Les mesures ne sont comparables qu'à site, latence et taux d'erreur identiques
+    config = {**site, 'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate}
+    baseline = {'config': config, 'results': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    if args.update_baseline:
+        if baseline['config'] != config:
+            baseline = {'config': config, 'results': {}}
+        baseline['results'].update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print(f'✅ Baseline saved to {args.baseline}')
+        return
+
+    if not baseline['results']:
+        print(f'❗ No baseline found at {args.baseline}. Run with --update-baseline to create it.')
+        return
+    if baseline['config'] != config:
+        print(f"❗ The baseline was measured with {baseline['config']}, not compared.")
+        return
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if regressions:
+        print('❌ Regressions against the baseline:')
+        for regression in regressions:
+            print(f'   {regression}')
+        sys.exit(1)
+    print('✅ No regression against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
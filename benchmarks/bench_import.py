@@ -0,0 +1,92 @@
+"""Budget de temps d'import des points d'entrée, mesuré avec `python -X importtime`.
+
+Chaque module est importé dans un interpréteur neuf, --repeat fois, et la médiane de son temps
+d'import cumulé est comparée à son budget. Le script vérifie aussi qu'aucune dépendance lourde
+n'est chargée là où elle n'est pas utilisée : `book_scraper.py history` ou `--help` ne doivent pas
+payer requests, BeautifulSoup, rich ou pandas.
+
+    python benchmarks/bench_import.py             # sort avec le code 1 si un budget est dépassé
+    python benchmarks/bench_import.py --scale 2   # budgets doublés, pour une machine lente
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Dépendances dont l'import coûte de quelques dizaines à quelques centaines de millisecondes
+HEAVY_MODULES = ('requests', 'bs4', 'lxml', 'selectolax', 'rich', 'pandas', 'pyarrow', 'PIL', 'multiprocessing')
+
+# Module -> (budget en millisecondes, dépendances lourdes interdites)
+BUDGETS = {
+    # Point d'entrée de la ligne de commande : les sous-commandes importent elles-mêmes ce dont elles ont besoin
+    'book_scraper': (80, HEAVY_MODULES),
+    'scraper.history': (30, HEAVY_MODULES),
+    'scraper.book_details_scraper.product_page': (30, HEAVY_MODULES),
+    'scraper.pipeline': (30, HEAVY_MODULES),
+    'scraper.parse_pool': (30, HEAVY_MODULES),
+    # Scripts historiques : requests et BeautifulSoup sont utilisés dès le premier appel, pandas seulement en script
+    'scraper.book_details_scraper.single_book_scraper': (200, ('rich', 'pandas', 'multiprocessing')),
+    'scraper.book_category_scraper.category_scraper': (250, ('rich', 'pandas', 'multiprocessing')),
+}
+
+
+def import_time(module):
+    """Importe module dans un nouvel interpréteur avec -X importtime.
+
+    Returns:
+        tuple: Temps d'import cumulé du module en millisecondes, et ensemble des modules chargés par cet import.
+    """
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    stderr = subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT_DIR).stderr
+    cumulative, imported = None, set()
+    # Les lignes sont de la forme "import time: self [us] | cumulative | nom", le nom indenté selon la profondeur
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        imported.add(name.strip())
+        if name == ' ' + module:
+            cumulative = int(total) / 1000
+    return cumulative, imported
+
+
+def measure(module, repeat):
+    """Retourne la médiane du temps d'import de module sur repeat mesures, et les modules chargés."""
+    runs = [import_time(module) for _ in range(repeat)]
+    return statistics.median(elapsed for elapsed, _ in runs), runs[-1][1]
+
+
+def main(argv=None):
+    """Mesure le temps d'import de chaque module de BUDGETS et le compare à son budget."""
+    parser = argparse.ArgumentParser(description="Vérifie le budget de temps d'import des points d'entrée.")
+    parser.add_argument('--module', action='append', choices=list(BUDGETS), help='Module à mesurer (plusieurs possibles). Par défaut, tous.')
+    parser.add_argument('--repeat', type=int, default=5, help='Nombre de mesures de chaque module, dont la médiane est retenue.')
+    parser.add_argument('--scale', type=float, default=1.0, help='Facteur appliqué à tous les budgets.')
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'module':<50}{'import ms':>10}{'budget ms':>11}  heavy modules loaded")
+    for module in args.module or BUDGETS:
+        budget, forbidden = BUDGETS[module]
+        budget *= args.scale
+        elapsed, imported = measure(module, args.repeat)
+        loaded = [name for name in forbidden if name in imported]
+        print(f"{module:<50}{elapsed:>10.1f}{budget:>11.0f}  {', '.join(loaded) or '-'}")
+        if elapsed > budget:
+            failures.append(f'{module}: {elapsed:.1f} ms > {budget:.0f} ms')
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)}")
+
+    if failures:
+        print('❌ Import budget exceeded:')
+        for failure in failures:
+            print(f'   {failure}')
+        sys.exit(1)
+    print('✅ Every import is within its budget.')
+
+
+if __name__ == '__main__':
+    main()
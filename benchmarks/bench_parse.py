@@ -0,0 +1,131 @@
+"""Micro-benchmark de l'extraction des pages produit, sur les pages enregistrées dans benchmarks/fixtures.
+
+L'ancien chemin (soup 'html.parser' puis une propriété par champ) sert de référence : le débit de
+parse_product_page avec chaque backend installé (html.parser, lxml, selectolax) est affiché en pages
+par seconde et en multiple de celui de la référence. Sur option, le script mesure aussi le débit
+d'un pool de processus d'analyse (ParsePool) et la normalisation des livres, livre par livre et par colonnes.
+
+    python benchmarks/bench_parse.py                           # backends d'extraction, 200 passages
+    python benchmarks/bench_parse.py --rounds 50               # mesure plus courte
+    python benchmarks/bench_parse.py --processes 1 2 4         # ajoute un pool de 1, 2 puis 4 processus
+    python benchmarks/bench_parse.py --normalize 100000        # ajoute la normalisation de 100 000 livres
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from bs4 import BeautifulSoup as bs
+# --- même astuce que dans scraper/book_category_scraper pour importer depuis la racine du projet --- #
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from book_scraper import BookScraper
+from scraper.book_details_scraper.product_page import (PARSERS, BookRecord, available_parsers, book_fields, default_bs4_parser,
+                                                        normalize_frame, parse_product_page)
+from scraper.parse_pool import ParsePool
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def legacy_extract(scraper, content):
+    """Ancien chemin : soup 'html.parser' puis une propriété (et un parcours de la soup) par champ."""
+    scraper._soup = bs(content, 'html.parser')
+    return {
+        'title': scraper.title,
+        'category': scraper.category,
+        'product_description': scraper.product_description,
+        'review_rating': scraper.review_rating,
+        'image_url': scraper.image_url,
+        'price_including_tax': scraper.table['Price (incl. tax)'],
+        'price_excluding_tax': scraper.table['Price (excl. tax)'],
+        'number_available': scraper.table['Availability'],
+        'universal_product_code (upc)': scraper.table['UPC'],
+    }
+
+
+def bench(extract, pages, rounds):
+    """Retourne le nombre de pages analysées par seconde."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for content in pages:
+            extract(content)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def bench_processes(pages, rounds, parser_name, processes):
+    """Retourne le nombre de pages analysées (et normalisées) par seconde par un ParsePool de processes processus."""
+    pool = ParsePool(processes, 'https://books.toscrape.com/', parser_name)
+    try:
+        # Démarrage des processus hors de la mesure
+        for future in [pool.submit(pages[0]) for _ in range(processes)]:
+            future.result()
+        start = time.perf_counter()
+        for future in [pool.submit(content) for _ in range(rounds) for content in pages]:
+            future.result()
+        return rounds * len(pages) / (time.perf_counter() - start)
+    finally:
+        pool.close()
+
+
+def bench_normalize(pages, books):
+    """Retourne le nombre de livres normalisés par seconde : livre par livre (BookRecord), puis par colonnes
+    (normalize_frame) à partir des lignes et à partir d'un DataFrame déjà construit, comme un instantané relu."""
+    import pandas as pd
+
+    fields = [book_fields(parse_product_page(content)) for content in pages]
+    rows = [dict(fields[i % len(fields)]) for i in range(books)]
+    frame = pd.DataFrame(rows)
+    results = {}
+    start = time.perf_counter()
+    for book in rows:
+        BookRecord.from_fields(book)
+    results['BookRecord.from_fields'] = books / (time.perf_counter() - start)
+    start = time.perf_counter()
+    normalize_frame(rows)
+    results['normalize_frame (rows)'] = books / (time.perf_counter() - start)
+    start = time.perf_counter()
+    normalize_frame(frame)
+    results['normalize_frame (DataFrame)'] = books / (time.perf_counter() - start)
+    return results
+
+
+def main(argv=None):
+    """Compare l'ancien chemin d'extraction et parse_product_page avec chaque backend installé."""
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'extraction des pages produit sur les fixtures.")
+    parser.add_argument('--rounds', type=int, default=200, help='Nombre de passages sur les fixtures.')
+    parser.add_argument('--processes', type=int, nargs='+', metavar='N',
+                        help="Mesure aussi le débit d'un pool de N processus d'analyse (par exemple --processes 1 2 4).")
+    parser.add_argument('--normalize', type=int, metavar='N',
+                        help='Compare aussi la normalisation de N livres, livre par livre et par colonnes (par exemple --normalize 100000).')
+    parser.add_argument('--pool-parser', choices=PARSERS, default=default_bs4_parser(), help='Backend utilisé par le pool de processus.')
+    args = parser.parse_args(argv)
+
+    pages = [open(path, 'rb').read() for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'product_*.html')))]
+    scraper = BookScraper()
+
+    results = {'legacy (html.parser + properties)': bench(lambda content: legacy_extract(scraper, content), pages, args.rounds)}
+    for parser_name in available_parsers():
+        results[f'parse_product_page ({parser_name})'] = bench(lambda content: parse_product_page(content, parser=parser_name), pages, args.rounds)
+
+    baseline = results['legacy (html.parser + properties)']
+    print(f'{len(pages)} fixture pages x {args.rounds} rounds')
+    for name, pages_per_sec in results.items():
+        print(f'{name:<40} {pages_per_sec:>10.1f} pages/sec  x{pages_per_sec / baseline:.2f}')
+
+    if args.processes:
+        print(f'\nParsePool ({args.pool_parser}), {os.cpu_count()} CPU')
+        single = None
+        for processes in args.processes:
+            pages_per_sec = bench_processes(pages, args.rounds, args.pool_parser, processes)
+            single = single or pages_per_sec / processes
+            print(f'{processes:>3} processes {pages_per_sec:>10.1f} pages/sec  x{pages_per_sec / single:.2f}  efficiency {pages_per_sec / (single * processes):.0%}')
+
+    if args.normalize:
+        results = bench_normalize(pages, args.normalize)
+        per_record = results['BookRecord.from_fields']
+        print(f'\nNormalisation de {args.normalize} livres')
+        for name, books_per_sec in results.items():
+            print(f'{name:<40} {books_per_sec:>10.1f} books/sec  x{books_per_sec / per_record:.2f}')
+
+
+if __name__ == '__main__':
+    main()
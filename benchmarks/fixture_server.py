@@ -0,0 +1,503 @@
+"""Serveur local qui imite books.toscrape.com pour les benchmarks hors ligne.
+
+Le catalogue (catégories, pages de liste paginées, pages produit et images) est généré de façon
+déterministe à partir d'une graine, avec le même balisage que le vrai site. Le serveur gère ETag /
+If-None-Match, et peut ajouter de la latence, de la gigue et des erreurs 503 aléatoires.
+
+    python benchmarks/fixture_server.py --port 8765 --latency 0.02 --jitter 0.005 --error-rate 0.01
+
+GET /__stats renvoie le nombre de requêtes, de pages HTML et d'octets servis, GET /__reset les remet à zéro.
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import random
+import re
+import socket
+import socketserver
+import sys
+import threading
+import time
+from html import escape
+
+
+CATEGORY_NAMES = [
+    'Travel', 'Mystery', 'Historical Fiction', 'Sequential Art', 'Classics', 'Philosophy', 'Romance',
+    'Womens Fiction', 'Fiction', 'Childrens', 'Religion', 'Nonfiction', 'Music', 'Default', 'Science Fiction',
+    'Sports and Games', 'Add a comment', 'Fantasy', 'New Adult', 'Young Adult', 'Science', 'Poetry',
+    'Paranormal', 'Art', 'Psychology', 'Autobiography', 'Parenting', 'Adult Fiction', 'Humor', 'Horror',
+    'History', 'Food and Drink', 'Christian Fiction', 'Business', 'Biography', 'Thriller', 'Contemporary',
+    'Spirituality', 'Academic', 'Self Help', 'Historical', 'Christian', 'Suspense', 'Short Stories',
+    'Novels', 'Health', 'Politics', 'Cultural', 'Erotica', 'Crime',
+]
+WORDS = ('light attic velvet soumission sharp objects sapiens requiem dirty little secrets coming woman '
+         'boys boat black maria starving hearts shakespeare sonnets set me free rip tide olio mesaerion '
+         'libertarianism beginners night dark secret garden wild lost city silent river').split()
+RATINGS = ['One', 'Two', 'Three', 'Four', 'Five']
+PAGE_SIZE = 20
+
+HOME_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+    <head>
+        <title>All products | Books to Scrape - Sandbox</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+        <link rel="stylesheet" type="text/css" href="static/oscar/css/styles.css" />
+    </head>
+    <body id="default" class="default">
+        <header class="header container-fluid">
+            <div class="page_inner"><div class="row"><div class="col-sm-8 h1"><a href="index.html">Books to Scrape</a><small> We love being scraped!</small></div></div></div>
+        </header>
+        <div class="container-fluid page"><div class="page_inner">
+            <ul class="breadcrumb"><li><a href="index.html">Home</a></li><li class="active">All products</li></ul>
+            <div class="row">
+                <aside class="sidebar col-sm-4 col-md-3">
+                    <div class="side_categories">
+                        <ul class="nav nav-list">
+                            <li>
+                                <a href="catalogue/category/books_1/index.html">
+                                    Books
+                                </a>
+                                <ul>
+{categories}
+                                </ul>
+                            </li>
+                        </ul>
+                    </div>
+                </aside>
+            </div>
+        </div></div>
+    </body>
+</html>
+'''
+
+HOME_CATEGORY_TEMPLATE = '''                                    <li>
+                                        <a href="catalogue/category/books/{slug}/index.html">
+                                            {name}
+                                        </a>
+                                    </li>'''
+
+CATEGORY_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+    <head>
+        <title>{name} | Books to Scrape - Sandbox</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+        <link rel="stylesheet" type="text/css" href="../../../../static/oscar/css/styles.css" />
+    </head>
+    <body id="default" class="default">
+        <div class="container-fluid page"><div class="page_inner">
+            <ul class="breadcrumb">
+                <li><a href="../../../../index.html">Home</a></li>
+                <li><a href="../../books_1/index.html">Books</a></li>
+                <li class="active">{name}</li>
+            </ul>
+            <div class="row">
+                <div class="col-sm-8 col-md-9">
+                    <div class="page-header action"><h1>{name}</h1></div>
+                    <form method="get" class="form-horizontal">
+                        <div style="display:none"></div>
+                        <strong>{total}</strong> results - showing <strong>{first}</strong> to <strong>{last}</strong>.
+                    </form>
+                    <section>
+                        <div>
+                            <ol class="row">
+{books}
+                            </ol>
+{pager}
+                        </div>
+                    </section>
+                </div>
+            </div>
+        </div></div>
+    </body>
+</html>
+'''
+
+CATEGORY_BOOK_TEMPLATE = '''                                <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+                                    <article class="product_pod">
+                                        <div class="image_container">
+                                            <a href="../../../{slug}/index.html"><img src="../../../../media/cache/{image}" alt="{title}" class="thumbnail"></a>
+                                        </div>
+                                        <p class="star-rating {rating}">
+                                            <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+                                        </p>
+                                        <h3><a href="../../../{slug}/index.html" title="{title}">{short_title}</a></h3>
+                                        <div class="product_price">
+                                            <p class="price_color">£{price:.2f}</p>
+                                            <p class="instock availability"><i class="icon-ok"></i> In stock</p>
+                                            <form><button type="submit" class="btn btn-primary btn-block" data-loading-text="Adding...">Add to basket</button></form>
+                                        </div>
+                                    </article>
+                                </li>'''
+
+PRODUCT_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+    <head>
+        <title>
+    {title} | Books to Scrape - Sandbox
+</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+        <meta name="description" content="
+    {description}
+" />
+        <link rel="stylesheet" type="text/css" href="../../static/oscar/css/styles.css" />
+    </head>
+    <body id="default" class="default">
+        <header class="header container-fluid">
+            <div class="page_inner"><div class="row"><div class="col-sm-8 h1"><a href="../../index.html">Books to Scrape</a><small> We love being scraped!</small></div></div></div>
+        </header>
+<div class="container-fluid page">
+    <div class="page_inner">
+    <ul class="breadcrumb">
+        <li>
+            <a href="../../index.html">Home</a>
+        </li>
+        <li>
+            <a href="../category/books_1/index.html">Books</a>
+        </li>
+        <li>
+            <a href="../category/books/{category_slug}/index.html">{category}</a>
+        </li>
+        <li class="active">{title}</li>
+    </ul>
+            <div id="messages">
+            </div>
+            <div class="content">
+                <div id="promotions">
+                </div>
+                <div id="content_inner">
+<article class="product_page"><!-- Start of product page -->
+    <div class="row">
+        <div class="col-sm-6">
+    <div id="product_gallery" class="carousel">
+        <div class="thumbnail">
+            <div class="carousel-inner">
+                <div class="item active">
+                    <img src="../../media/cache/{image}" alt="{title}" />
+                </div>
+            </div>
+        </div>
+    </div>
+        </div>
+        <div class="col-sm-6 product_main">
+            <h1>{title}</h1>
+<p class="price_color">£{price:.2f}</p>
+<p class="instock availability">
+    <i class="icon-ok"></i>
+        In stock ({stock} available)
+</p>
+    <p class="star-rating {rating}">
+        <i class="icon-star"></i>
+        <i class="icon-star"></i>
+        <i class="icon-star"></i>
+        <i class="icon-star"></i>
+        <i class="icon-star"></i>
+    </p>
+            <hr/>
+<div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website for web scraping purposes. Prices and ratings here were randomly assigned and have no real meaning.</div>
+        </div><!-- /col-sm-6 -->
+    </div><!-- /row -->
+    <div id="product_description" class="sub-header">
+        <h2>Product Description</h2>
+    </div>
+    <p>{description}</p>
+    <div class="sub-header">
+        <h2>Product Information</h2>
+    </div>
+    <table class="table table-striped">
+        <tr>
+            <th>UPC</th><td>{upc}</td>
+        </tr>
+        <tr>
+            <th>Product Type</th><td>Books</td>
+        </tr>
+            <tr>
+                <th>Price (excl. tax)</th><td>£{price:.2f}</td>
+            </tr>
+                <tr>
+                    <th>Price (incl. tax)</th><td>£{price:.2f}</td>
+                </tr>
+                <tr>
+                    <th>Tax</th><td>£0.00</td>
+                </tr>
+            <tr>
+                <th>Availability</th>
+                <td>In stock ({stock} available)</td>
+            </tr>
+            <tr>
+                <th>Number of reviews</th>
+                <td>0</td>
+            </tr>
+    </table>
+    <div id="reviews" class="reviews">
+    </div>
+</article><!-- End of product page -->
+                </div>
+            </div>
+    </div>
+</div><!-- /container-fluid -->
+<footer class="footer container-fluid">
+</footer>
+    </body>
+</html>
+'''
+
+
+class Catalogue:
+    """Faux catalogue déterministe, rendu avec le balisage de books.toscrape.com.
+
+    Args:
+        categories (int): Nombre de catégories (au plus len(CATEGORY_NAMES)).
+        books (int): Nombre total de livres. La première catégorie en reçoit un tiers, comme 'Default' sur le vrai site.
+        seed (int): Graine du générateur : une même graine donne toujours le même site.
+        placeholder_ratio (float): Part des livres qui partagent la même image de couverture.
+    """
+
+    def __init__(self, categories=5, books=200, seed=0, placeholder_ratio=0.1):
+        rng = random.Random(seed)
+        names = CATEGORY_NAMES[:max(1, min(categories, len(CATEGORY_NAMES)))]
+        sizes = [0] * len(names)
+        for book_number in range(books):
+            sizes[0 if book_number % 3 == 0 else rng.randrange(len(names))] += 1
+
+        self.categories = []
+        self.books = {}
+        self.images = {}
+        placeholder = 'ff/00/placeholder.jpg'
+        self.images[placeholder] = self._image_bytes(rng, 'placeholder')
+        book_id = 1000
+        for position, (name, size) in enumerate(zip(names, sizes), start=2):
+            slug = f"{name.lower().replace(' ', '-')}_{position}"
+            category_books = []
+            for _ in range(size):
+                title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+                book_slug = f"{re.sub('[^a-z0-9]+', '-', title.lower()).strip('-')}_{book_id}"
+                if rng.random() < placeholder_ratio:
+                    image = placeholder
+                else:
+                    digest = hashlib.md5(book_slug.encode()).hexdigest()
+                    image = f'{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+                    self.images[image] = None
+                self.books[book_slug] = {
+                    'title': title,
+                    'category': name,
+                    'category_slug': slug,
+                    'price': round(rng.uniform(10, 60), 2),
+                    'stock': rng.randint(1, 22),
+                    'rating': rng.choice(RATINGS),
+                    'upc': hashlib.sha1(book_slug.encode()).hexdigest()[:16],
+                    'image': image,
+                    'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(60, 250))).capitalize() + ' ...more',
+                }
+                category_books.append(book_slug)
+                book_id -= 1
+            self.categories.append((name, slug, category_books))
+        self._category_by_slug = {slug: (name, slug, books) for name, slug, books in self.categories}
+
+    @staticmethod
+    def _image_bytes(rng, label):
+        # Marqueurs de début et de fin JPEG autour de données pseudo-aléatoires, de la taille d'une vraie couverture
+        return b'\xff\xd8\xff\xe0' + label.encode() + rng.randbytes(rng.randint(8000, 16000)) + b'\xff\xd9'
+
+    def home(self):
+        items = '\n'.join(HOME_CATEGORY_TEMPLATE.format(slug=slug, name=escape(name)) for name, slug, _ in self.categories)
+        return HOME_TEMPLATE.format(categories=items)
+
+    def category_page(self, slug, page):
+        if slug not in self._category_by_slug:
+            return None
+        name, slug, books = self._category_by_slug[slug]
+        pages = max(1, -(-len(books) // PAGE_SIZE))
+        if not 1 <= page <= pages:
+            return None
+        chunk = books[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        items = '\n'.join(
+            CATEGORY_BOOK_TEMPLATE.format(slug=book_slug, short_title=escape(self.books[book_slug]['title'][:40]),
+                                          **{key: escape(value) if isinstance(value, str) else value for key, value in self.books[book_slug].items()})
+            for book_slug in chunk
+        )
+        pager = ''
+        if pages > 1:
+            pager = '<div><ul class="pager">'
+            if page > 1:
+                pager += f'<li class="previous"><a href="page-{page - 1}.html">previous</a></li>'
+            pager += f'<li class="current">\n            Page {page} of {pages}\n        </li>'
+            if page < pages:
+                pager += f'<li class="next"><a href="page-{page + 1}.html">next</a></li>'
+            pager += '</ul></div>'
+        first = (page - 1) * PAGE_SIZE + 1
+        return CATEGORY_TEMPLATE.format(name=escape(name), total=len(books), first=first, last=first + len(chunk) - 1, books=items, pager=pager)
+
+    def product_page(self, book_slug):
+        book = self.books.get(book_slug)
+        if book is None:
+            return None
+        return PRODUCT_TEMPLATE.format(**{key: escape(value) if isinstance(value, str) else value for key, value in book.items()})
+
+    def image(self, path):
+        if path not in self.images:
+            return None
+        if self.images[path] is None:
+            self.images[path] = self._image_bytes(random.Random(path), path)
+        return self.images[path]
+
+    def route(self, path):
+        """Retourne (corps, type de contenu) pour le chemin demandé, ou (None, None) pour une 404."""
+        path = re.sub('/+', '/', path.split('?')[0])
+        if path in ('/', '/index.html'):
+            return self.home().encode(), 'text/html'
+        match = re.fullmatch(r'/catalogue/category/books/([^/]+)/(?:index|page-(\d+))\.html', path)
+        if match:
+            body = self.category_page(match[1], int(match[2] or 1))
+            return (body.encode(), 'text/html') if body else (None, None)
+        match = re.fullmatch(r'/catalogue/([^/]+)/index\.html', path)
+        if match:
+            body = self.product_page(match[1])
+            return (body.encode(), 'text/html') if body else (None, None)
+        if path.startswith('/media/cache/'):
+            body = self.image(path[len('/media/cache/'):])
+            return (body, 'image/jpeg') if body else (None, None)
+        return None, None
+
+
+class FixtureRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, l'ACK retardé ajoute ~40 ms par réponse
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/plain', headers=None, record=True):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        if record:
+            self.server.record(len(body), status == 200 and content_type == 'text/html')
+
+    def do_GET(self):
+        server = self.server
+        if self.path == '/__stats':
+            return self._send(200, json.dumps(server.stats()).encode(), 'application/json', record=False)
+        if self.path == '/__reset':
+            server.reset()
+            return self._send(200, record=False)
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            return self._send(503, b'Service Unavailable')
+
+        body, content_type = server.catalogue.route(self.path)
+        if body is None:
+            return self._send(404, b'Not Found')
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+        self._send(200, body, content_type, {'ETag': etag})
+
+
+class FixtureHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, catalogue, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__(address, FixtureRequestHandler)
+        self.catalogue = catalogue
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._stats_lock = threading.Lock()
+        self.reset()
+
+    def handle_error(self, request, client_address):
+        # Un client qui ferme sa connexion keep-alive n'est pas une erreur du serveur
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def record(self, size, page):
+        with self._stats_lock:
+            self.requests += 1
+            self.pages += page
+            self.bytes_sent += size
+
+    def reset(self):
+        with self._stats_lock:
+            self.requests = 0
+            self.pages = 0
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {'requests': self.requests, 'pages': self.pages, 'bytes_sent': self.bytes_sent}
+
+
+class FixtureServer:
+    """Serveur de fixtures lancé dans un thread, utilisable comme gestionnaire de contexte.
+
+    Args:
+        port (int): Port d'écoute, 0 pour en choisir un libre.
+        latency (float): Délai ajouté à chaque réponse, en secondes.
+        jitter (float): Écart aléatoire maximal autour de la latence, en secondes.
+        error_rate (float): Probabilité de répondre 503 au lieu de la page.
+        **catalogue_options: categories, books, seed, placeholder_ratio (voir Catalogue).
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, **catalogue_options):
+        self.httpd = FixtureHTTPServer(('127.0.0.1', port), Catalogue(**catalogue_options), latency, jitter, error_rate)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def free_port():
+    """Retourne un port TCP libre sur localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(port, latency=0.0, jitter=0.0, error_rate=0.0, **catalogue_options):
+    """Lance le serveur au premier plan (ligne de commande, ou processus enfant de bench_crawl.py)."""
+    httpd = FixtureHTTPServer(('127.0.0.1', port), Catalogue(**catalogue_options), latency, jitter, error_rate)
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serveur local qui imite books.toscrape.com.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.02, help='Latence ajoutée à chaque réponse, en secondes.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Écart aléatoire maximal autour de la latence, en secondes.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilité de répondre 503.')
+    parser.add_argument('--categories', type=int, default=5)
+    parser.add_argument('--books', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(f'Serving a fake books.toscrape.com on http://127.0.0.1:{args.port}/')
+    serve(args.port, args.latency, args.jitter, args.error_rate, categories=args.categories, books=args.books, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
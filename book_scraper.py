@@ -1,38 +1,274 @@
-import os, time, requests, pandas as pd
-from bs4 import BeautifulSoup as bs
-from rich.table import Table
-from rich.console import Console
+import argparse, json, os, re, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urljoin
+# Modules légers uniquement : requests, BeautifulSoup et rich sont importés par les fonctions qui s'en servent,
+# pour que les sous-commandes qui n'en ont pas besoin (history, --help) démarrent vite
+from scraper.book_details_scraper.product_page import BS4_PARSERS, PARSERS, BookRecord, book_fields, default_bs4_parser, normalize_book_data, parse_product_page
+from scraper.crawl_index import CHANGED, NEW, UNCHANGED, CrawlIndex, content_hash
+from scraper.fingerprints import CATEGORIES, LISTING, PRODUCT, FingerprintTable
+from scraper.frontier import DONE as FRONTIER_DONE, Frontier
+from scraper.history import PriceHistory
+from scraper.http_cache import HttpCache
+from scraper.image_store import UNCHANGED as IMAGE_UNCHANGED, ImageStore
+from scraper.memory import ByteBudget
+from scraper.metrics import Metrics
+from scraper.parse_pool import ParsePool, extract_record
+from scraper.pipeline import CategoryPipeline
+from scraper.sinks import SINKS
+
+# Type de changement d'un livre dont la page n'a pas pu être téléchargée, même après les nouvelles tentatives
+FETCH_FAILED = 'fetch_failed'
+
+# Régions lues sur la page d'accueil et sur les pages de liste (arguments de SoupStrainer) : le reste n'est pas analysé
+CATEGORY_REGIONS = {'name': 'div', 'class_': 'side_categories'}
+LISTING_REGIONS = {'name': ['article', 'li'], 'class_': ['product_pod', 'current', 'next']}
 
 
 class BookScraper:
-    def __init__(self, base_url='https://books.toscrape.com/'):
+    def __init__(self, base_url='https://books.toscrape.com/', max_workers=1, max_connections_per_host=10, parser=None, cache=None, index=None, delta_only=False, output_format='csv', batch_size=100, frontier=None, images=None, metrics=None, scheduler=None, parse_processes=0, history=None, memory=None, fingerprints=None):
         """Initialisation de la classe BookScraper.
 
         Args:
             base_url (str): URL de base du site à scraper. Par défaut, 'https://books.toscrape.com/'.
+            max_workers (int): Nombre de livres traités en parallèle (page, analyse et image). Par défaut, 1 (mode séquentiel).
+            max_connections_per_host (int): Nombre maximum de requêtes simultanées vers un même hôte. Par défaut, 10.
+            parser (str): Backend d'analyse HTML ('selectolax', 'lxml' ou 'html.parser'). Par défaut, None pour le plus rapide installé parmi ceux de BeautifulSoup.
+            cache (HttpCache): Cache HTTP persistant utilisé pour les requêtes conditionnelles. Par défaut, None (pas de cache).
+            index (CrawlIndex): Index des livres vus aux exécutions précédentes, qui active le mode incrémental. Par défaut, None.
+            delta_only (bool): En mode incrémental, n'écrit que les livres nouveaux ou modifiés. Par défaut, False (instantané complet).
+            output_format (str): Format des fichiers de données ('csv', 'parquet' ou 'jsonl'). Par défaut, 'csv'.
+            batch_size (int): Nombre de lignes gardées en mémoire avant d'être écrites dans le fichier. Par défaut, 100.
+            frontier (Frontier): Frontière persistante qui enregistre l'avancement du crawl pour pouvoir le reprendre. Par défaut, None.
+            images (ImageStore): Stockage des images dédupliqué par contenu. Par défaut, None (un fichier par livre, via le cache HTTP).
+            metrics (Metrics): Compteurs et histogrammes de latence du crawl. Par défaut, None pour en créer un nouveau.
+            scheduler (RequestScheduler): Limite de débit, concurrence adaptative et nouvelles tentatives des requêtes. Par défaut, None
+                pour en créer un avec max_connections_per_host comme concurrence maximale.
+            parse_processes (int): Nombre de processus qui analysent les pages produit. Par défaut, 0 pour les analyser dans les threads.
+            history (PriceHistory): Historique des prix et des stocks, qui reçoit un instantané de chaque livre. Par défaut, None.
+            memory (ByteBudget): Plafond des octets de pages téléchargées en attente d'analyse. Par défaut, None pour un budget
+                sans limite, qui mesure seulement le pic.
+            fingerprints (FingerprintTable): Empreintes des pages déjà analysées : une page identique octet pour octet à
+                la dernière fois n'est pas réanalysée. Par défaut, None.
         """
         self.base_url = base_url
-        self._soup = None
+        self.max_workers = max(1, max_workers)
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.parser = parser or default_bs4_parser()
+        self.cache = cache
+        self.index = index
+        self.delta_only = delta_only
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.frontier = frontier
+        self.images = images
+        self.history = history
+        self.scraped_at = history.scraped_at if history is not None else time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.memory = memory if memory is not None else ByteBudget()
+        self.fingerprints = fingerprints
+        self.metrics = metrics if metrics is not None else Metrics()
+        # selectolax ne sert qu'aux pages produit, les autres pages passent toujours par BeautifulSoup
+        self._soup_parser = self.parser if self.parser in BS4_PARSERS else default_bs4_parser()
+        # Chaque thread garde sa propre soup, les propriétés d'extraction restent donc utilisables en parallèle
+        self._local = threading.local()
+        # Images en échec malgré les nouvelles tentatives, retentées par retry_failed_images
+        self._failed_images = []
+        self._failed_images_lock = threading.Lock()
+        import requests
+        from requests.adapters import HTTPAdapter
+        from scraper.rate_limiter import RequestScheduler
+
+        self.parse_pool = ParsePool(parse_processes, base_url, self.parser) if parse_processes > 0 else None
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler(self.max_connections_per_host, metrics=self.metrics)
         self.session = requests.Session() # j'essaye en  remplacant requests.get par requests.Session() pour tester la persistance de la session pour les performances
-        
-    def get_soup(self, url):
-        """Récupère et analyse le contenu d'une page we.
+        # Le pool de connexions doit être au moins aussi grand que la concurrence maximale par hôte, sinon urllib3 rejette les connexions en trop
+        # (les nouvelles tentatives sont gérées par le scheduler, pas par urllib3)
+        adapter = HTTPAdapter(pool_maxsize=self.scheduler.max_concurrency, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        """Enregistre les index (cache HTTP, mode incrémental, empreintes, images), la frontière et l'historique des prix, puis ferme la session et les processus d'analyse."""
+        if self.cache is not None:
+            self.cache.flush()
+        if self.index is not None:
+            self.index.flush()
+        if self.frontier is not None:
+            self.frontier.close()
+        if self.history is not None:
+            self.history.close()
+        if self.fingerprints is not None:
+            self.fingerprints.close()
+        if self.images is not None:
+            self.images.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        self.session.close()
+
+    @property
+    def _soup(self):
+        """Soup de la dernière page récupérée par le thread courant."""
+        return getattr(self._local, 'soup', None)
+
+    @_soup.setter
+    def _soup(self, soup):
+        self._local.soup = soup
+
+    def _get(self, url, headers=None, hold=False):
+        """Envoie une requête GET via la session, à travers le scheduler.
+
+        Le scheduler applique la limite de débit et de concurrence de l'hôte, le timeout, et retente
+        la requête avec un délai croissant en cas d'erreur de connexion, de timeout ou de réponse 429 / 5xx.
 
         Args:
-            url (str): URL de la page web à scraper.
-        
+            url (str): URL à récupérer.
+            headers (dict): En-têtes supplémentaires de la requête. Par défaut, None.
+            hold (bool): Réserve le corps de la réponse dans le budget mémoire avant la requête, d'après la taille
+                moyenne des pages déjà lues, puis ajuste la réservation à sa taille réelle. Pour une réponse réussie,
+                len(response.content) octets restent réservés, à rendre par l'appelant ; rien pour une réponse en erreur.
+
+        Raises:
+            requests.RequestException: Si la dernière tentative échoue (erreur de connexion ou timeout).
+
+        Returns:
+            requests.Response: Réponse HTTP.
+        """
+        # L'attente de place dans le budget se fait hors du scheduler : elle ne garde ni l'hôte réservé ni une connexion
+        # ouverte, et n'est pas comptée dans la latence qui règle la concurrence par hôte
+        expected = self.memory.acquire_estimate() if hold else 0
+        send = lambda timeout: self.session.get(url, headers=headers, timeout=timeout)
+        try:
+            with self.metrics.timer('http_request_seconds'), self.scheduler.request(url, send) as response:
+                pass
+        except BaseException:
+            if hold:
+                self.memory.release(expected)
+            raise
+        if hold:
+            self.memory.resize(expected, len(response.content) if response.ok else 0)
+        self.metrics.inc('http_requests_total')
+        self.metrics.inc('http_bytes_total', len(response.content))
+        if response.status_code == 304:
+            self.metrics.inc('http_not_modified_total')
+        return response
+
+    def _download(self, url, hold=False):
+        """Télécharge une URL en passant par le cache HTTP s'il est activé.
+
+        Si l'URL est en cache, la requête est conditionnelle (If-None-Match / If-Modified-Since)
+        et une réponse 304 renvoie le contenu du cache sans retransférer le corps.
+
+        Args:
+            url (str): URL à récupérer.
+            hold (bool): Réserve le contenu renvoyé dans le budget mémoire (len(content) octets, à rendre par l'appelant).
+
         Raises:
             requests.RequestException: Si une erreur se produit lors de la requête HTTP.
-            
-        Sets:
-            self._soup (BeautifulSoup): Contenu de la page web analysé
+
+        Returns:
+            tuple: Contenu de la réponse (bytes) et True si le serveur a répondu 304 Not Modified.
         """
+        headers = self.cache.validators(url) if self.cache is not None else None
+        response = self._get(url, headers, hold)
+        if response.status_code == 304 and headers:
+            content = self.cache.revalidated(url)
+            if content is not None:
+                if hold:
+                    self.memory.acquire(len(content))
+                return content, True
+            # L'entrée a disparu du cache entre-temps : on retélécharge sans condition
+            response = self._get(url, hold=hold)
+        # Rien n'est réservé pour une réponse en erreur
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.store(url, response.content, response.headers)
+        return response.content, False
+
+    def _fetch(self, url, hold=False):
+        """Télécharge le contenu brut d'une page web.
+
+        Args:
+            url (str): URL de la page web à récupérer.
+            hold (bool): Réserve le contenu dans le budget mémoire avant de le lire ; l'appelant rend len(content)
+                octets une fois la page analysée. Par défaut, False.
+
+        Returns:
+            bytes: Contenu de la réponse, ou None si la requête a échoué.
+        """
+        import requests
+
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            self._soup = bs(response.content, 'html.parser')
+            content, _ = self._download(url, hold)
+            return content
         except requests.RequestException as e:
+            self.metrics.inc('http_errors_total')
             print(f'❌ Error fetching URL {url}: {e}')
+            return None
+
+    def get_soup(self, url, regions=None):
+        """Récupère et analyse le contenu d'une page we.
+
+        La soup précédente du thread est libérée avant, pour ne jamais garder deux arbres à la fois.
+
+        Args:
+            url (str): URL de la page web à scraper.
+            regions (dict): Arguments de SoupStrainer limitant l'analyse aux régions utiles de la page. Par défaut, None pour toute la page.
+            
+        Sets:
+            self._soup (BeautifulSoup): Contenu de la page web analysé, ou None si la requête a échoué.
+        """
+        self.release_soup()
+        with self.metrics.timer('get_soup_network_seconds'):
+            content = self._fetch(url)
+        if content is not None:
+            self._parse_soup(content, regions)
+
+    def _parse_soup(self, content, regions):
+        """Analyse le contenu d'une page dans self._soup, limité aux régions données (arguments de SoupStrainer) s'il y en a."""
+        from bs4 import BeautifulSoup as bs, SoupStrainer
+
+        with self.metrics.timer('get_soup_parse_seconds'):
+            self._soup = bs(content, self._soup_parser, parse_only=SoupStrainer(**regions) if regions else None)
+
+    def read_page(self, url, kind, extract, regions=None):
+        """Récupère une page et en extrait des données, sans l'analyser si elle n'a pas changé depuis la dernière fois.
+
+        Avec la table d'empreintes, l'empreinte du contenu téléchargé est comparée à celle de la dernière analyse
+        de la même URL : si elles sont égales, les données extraites alors sont réutilisées telles quelles.
+
+        Args:
+            url (str): URL de la page.
+            kind (str): Type de page dans la table d'empreintes (LISTING ou CATEGORIES de scraper.fingerprints).
+            extract (callable): extract(soup) renvoie les données de la page, sérialisables en JSON.
+            regions (dict): Arguments de SoupStrainer limitant l'analyse aux régions utiles de la page. Par défaut, None.
+
+        Returns:
+            Données extraites par extract, ou None si la page n'a pas pu être récupérée.
+        """
+        self.release_soup()
+        with self.metrics.timer('get_soup_network_seconds'):
+            content = self._fetch(url)
+        fingerprint = None
+        if content is not None:
+            if self.fingerprints is not None:
+                fingerprint = self.fingerprints.fingerprint(content)
+                data = self.fingerprints.reuse(kind, url, fingerprint)
+                if data is not None:
+                    self.metrics.inc('parse_skipped_total')
+                    return data
+            self._parse_soup(content, regions)
+        if not self._validate_soup():
+            return None
+        data = extract(self._soup)
+        self.release_soup()
+        if fingerprint is not None:
+            self.fingerprints.store(kind, url, fingerprint, data)
+        return data
+
+    def release_soup(self):
+        """Libère la soup du thread courant, sans attendre le ramasse-miettes (l'arbre est plein de cycles parent / enfant)."""
+        if self._soup is not None:
+            self._soup.decompose()
             self._soup = None
 
     def _validate_soup(self):
@@ -62,12 +298,8 @@ class BookScraper:
         Returns:
             dict: Dictionnaire de données normalisées du livre.
         """
-        rating_dict = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
-        data['review_rating'] = rating_dict.get(data['review_rating'], 'No rating found')
-        data['price_including_tax'] = float(data['price_including_tax'].replace('£', ''))
-        data['price_excluding_tax'] = float(data['price_excluding_tax'].replace('£', ''))
-        data['number_available'] = int(data['number_available'].replace('In stock (', '').replace(' available)', ''))
-        data['universal_product_code'] = data.pop('universal_product_code (upc)')
+        # Même normalisation que celle des processus d'analyse (voir scraper/parse_pool.py)
+        normalize_book_data(data)
     
     
     def get_all_categories_urls(self):
@@ -76,12 +308,12 @@ class BookScraper:
         Returns:
             dict: Dictionnaire des noms de catégories et de leurs URL.
         """
-        self.get_soup(self.base_url)
-        if not self._validate_soup():
-            return {}
+        return self.read_page(self.base_url, CATEGORIES, self._extract_categories, CATEGORY_REGIONS) or {}
 
+    def _extract_categories(self, soup):
+        """Extrait les noms et URL des catégories du menu de la page d'accueil."""
         category_urls = {}
-        categories_section = self._soup.find('div', class_='side_categories')
+        categories_section = soup.find('div', class_='side_categories')
         categories_links = categories_section.find_all('a')[1:]
         for link in categories_links:
             category_name = link.text.strip()
@@ -89,6 +321,91 @@ class BookScraper:
             category_urls[category_name] = category_url
         return category_urls
     
+    def _read_listing_page(self, url):
+        """Récupère une page de liste d'une catégorie.
+
+        Args:
+            url (str): URL de la page de liste.
+
+        Returns:
+            tuple: URL des livres de la page (list), nombre total de pages lu dans « Page x of N » (int, ou None
+            si la catégorie tient sur une page ou si l'indication est absente) et URL de la page suivante (ou None).
+            None si la page n'a pas pu être récupérée.
+        """
+        page = self.read_page(url, LISTING, lambda soup: self._extract_listing(soup, url), LISTING_REGIONS)
+        return tuple(page) if page is not None else None
+
+    def _extract_listing(self, soup, url):
+        """Extrait d'une page de liste les URL des livres, le nombre de pages et l'URL de la page suivante (voir _read_listing_page)."""
+        books_urls = []
+        for book in soup.find_all('article', class_='product_pod'):
+            books_urls.append(book.find('h3').find('a').get('href').replace('../../..', self.base_url + 'catalogue/'))
+
+        page_count = None
+        current = soup.find('li', class_='current')
+        if current:
+            match = re.search(r'Page\s+\d+\s+of\s+(\d+)', current.text)
+            page_count = int(match[1]) if match else None
+
+        next_page_full_url = None
+        next_page = soup.find('li', class_='next')
+        if next_page:
+            next_page_url = next_page.a.get('href')
+            if next_page_url.startswith('/'):
+                next_page_full_url = self.base_url + next_page_url
+            else:
+                next_page_full_url = url.rsplit('/', 1)[0] + '/' + next_page_url
+        return books_urls, page_count, next_page_full_url
+
+    def iter_category_pages(self, category_url):
+        """Parcourt les pages de liste d'une catégorie et renvoie les URL de livres de chacune, dans l'ordre.
+
+        Le nombre de pages est lu sur la première (« Page 1 of N ») : les pages 2 à N sont alors
+        téléchargées en parallèle et chacune est renvoyée dès qu'elle et les précédentes sont arrivées.
+        Sans cette indication, le lien « next » est suivi page par page, sans récursion.
+
+        Args:
+            category_url (str): URL de la catégorie à scraper.
+
+        Yields:
+            list: URL des livres d'une page, ou None si la page n'a pas pu être récupérée.
+        """
+        first_page = self._read_listing_page(category_url)
+        if first_page is None:
+            yield None
+            return
+        books_urls, page_count, next_page_url = first_page
+        yield books_urls
+
+        if page_count and page_count > 1:
+            page_dir = category_url.rsplit('/', 1)[0]
+            page_urls = [f'{page_dir}/page-{number}.html' for number in range(2, page_count + 1)]
+            # La limite par hôte du scheduler s'applique toujours : le pool ne fait que lancer les requêtes
+            with ThreadPoolExecutor(max_workers=min(len(page_urls), self.max_connections_per_host)) as executor:
+                for page in executor.map(self._read_listing_page, page_urls):
+                    yield page[0] if page is not None else None
+            return
+
+        while next_page_url:
+            page = self._read_listing_page(next_page_url)
+            if page is None:
+                yield None
+                return
+            books_urls, _, next_page_url = page
+            yield books_urls
+
+    def iter_category_books_urls(self, category_url):
+        """Renvoie les URL des livres d'une catégorie au fur et à mesure que ses pages de liste arrivent.
+
+        Args:
+            category_url (str): URL de la catégorie à scraper.
+
+        Yields:
+            str: URL d'un livre, dans l'ordre des pages de liste.
+        """
+        for books_urls in self.iter_category_pages(category_url):
+            yield from books_urls or ()
+
     def get_category_books_urls(self, category_url, books_urls=None):
         """Récupère les URL de tous les livres d'une catégorie donnée, avec pagination.
 
@@ -101,27 +418,71 @@ class BookScraper:
         """
         if books_urls is None:
             books_urls = []
+        books_urls.extend(self.iter_category_books_urls(category_url))
+        return books_urls
 
-        self.get_soup(category_url)
-        if not self._validate_soup():
-            return books_urls
+    def list_categories(self):
+        """Retourne les catégories à scraper, depuis la frontière si le crawl est repris.
 
-        books = self._soup.find_all('article', class_='product_pod')
-        for book in books:
-            book_url = book.find('h3').find('a').get('href').replace('../../..', self.base_url + 'catalogue/')
-            books_urls.append(book_url)
+        Returns:
+            dict: Dictionnaire des noms de catégories et de leurs URL.
+        """
+        if self.frontier is not None:
+            category_urls = self.frontier.categories()
+            if category_urls:
+                return category_urls
+        category_urls = self.get_all_categories_urls()
+        if self.frontier is not None and category_urls:
+            self.frontier.add_categories(category_urls)
+        return category_urls
+
+    def iter_category_books(self, category_name, category_url):
+        """Renvoie les URL des livres d'une catégorie au fur et à mesure, sans relire ses pages si la frontière les connaît déjà.
+
+        Chaque page de liste est enregistrée dans la frontière avant que ses livres soient renvoyés; la catégorie
+        n'y est marquée comme listée que si toutes ses pages ont été récupérées.
+
+        Args:
+            category_name (str): Nom de la catégorie.
+            category_url (str): URL de la catégorie.
+
+        Yields:
+            str: URL d'un livre, dans l'ordre des pages de liste.
+        """
+        if self.frontier is not None:
+            books_urls = self.frontier.category_books(category_name)
+            if books_urls is not None:
+                yield from books_urls
+                return
+        position = 0
+        complete = True
+        for books_urls in self.iter_category_pages(category_url):
+            if books_urls is None:
+                complete = False
+                continue
+            if self.frontier is not None:
+                self.frontier.add_category_books(category_name, books_urls, start=position, complete=False)
+            position += len(books_urls)
+            yield from books_urls
+        if self.frontier is not None and complete and position:
+            self.frontier.mark_category_listed(category_name)
+
+    def list_category_books(self, category_name, category_url):
+        """Retourne les URL des livres d'une catégorie, sans relire ses pages si la frontière les connaît déjà.
+
+        Args:
+            category_name (str): Nom de la catégorie.
+            category_url (str): URL de la catégorie.
+
+        Returns:
+            list: Liste contenant les URL de tous les livres de la catégorie.
+        """
+        return list(self.iter_category_books(category_name, category_url))
+
+    def category_done(self, category_name):
+        """Indique si la catégorie a déjà été entièrement sauvegardée par l'exécution reprise."""
+        return self.frontier is not None and self.frontier.category_status(category_name) == FRONTIER_DONE
 
-        next_page = self._soup.find('li', class_='next')
-        if next_page:
-            next_page_url = next_page.a.get('href')
-            if next_page_url.startswith('/'):
-                next_page_full_url = self.base_url + next_page_url
-            else:
-                next_page_full_url = category_url.rsplit('/', 1)[0] + '/' + next_page_url
-            return self.get_category_books_urls(next_page_full_url, books_urls)
-        else:
-            return books_urls
-            
     @property
     def title(self):
         """Extrait le titre du livre.
@@ -204,130 +565,1014 @@ class BookScraper:
             return data_dict
         return 'Soup not set'
 
+    @contextmanager
+    def _stream(self, url, headers=None):
+        """Ouvre une réponse en streaming via le scheduler, en gardant la place de connexion de l'hôte jusqu'à la fin de la lecture.
+
+        Args:
+            url (str): URL à récupérer.
+            headers (dict): En-têtes supplémentaires de la requête. Par défaut, None.
+
+        Yields:
+            requests.Response: Réponse dont le corps est lu par morceaux avec iter_content.
+        """
+        send = lambda timeout: self.session.get(url, headers=headers, stream=True, timeout=timeout)
+        with self.scheduler.request(url, send) as response, response:
+            yield response
+        self.metrics.inc('http_requests_total')
+        if response.status_code == 304:
+            self.metrics.inc('http_not_modified_total')
+        else:
+            self.metrics.inc('http_bytes_total', int(response.headers.get('Content-Length', 0)))
+
     def download_image(self, image_url, save_path):
         """Télécharge et sauvegarde l'image du livre.
 
+        Avec un ImageStore, l'image est téléchargée en streaming dans le stockage dédupliqué par contenu
+        et save_path devient un lien vers l'objet stocké. Sinon, elle passe par le cache HTTP.
+
+        En cas d'échec, l'image est remise en file pour retry_failed_images.
+
         Args:
             image_url (str): URL de l'image à télécharger.
             save_path (str): Chemin complet où sauvegarder l'image localement.
-        
-        Raises:
-            requests.RequestException: Si une erreur se produit lors de la requête HTTP.
+
+        Returns:
+            bool: True si l'image est disponible à save_path, False si le téléchargement a échoué.
         """
+        import requests
+
         try:
-            response = self.session.get(image_url)
-            response.raise_for_status()
-            with open(save_path, 'wb') as image_file:
-                image_file.write(response.content)
-            print(f"Image saved to {save_path}")
+            with self.metrics.timer('image_download_seconds'):
+                self._save_image(image_url, save_path)
+            return True
         except requests.RequestException as e:
+            self.metrics.inc('image_errors_total')
             print(f"❌ Failed to download image: {e}")
+            with self._failed_images_lock:
+                self._failed_images.append((image_url, save_path))
+            return False
 
+    def retry_failed_images(self):
+        """Retente une dernière fois le téléchargement des images en échec depuis l'appel précédent."""
+        import requests
+
+        with self._failed_images_lock:
+            failed, self._failed_images = self._failed_images, []
+        for image_url, save_path in failed:
+            self.metrics.inc('images_requeued_total')
+            print(f'🔁 Retrying {image_url}')
+            try:
+                with self.metrics.timer('image_download_seconds'):
+                    self._save_image(image_url, save_path)
+            except requests.RequestException as e:
+                self.metrics.inc('image_errors_total')
+                print(f"❌ Failed to download image: {e}")
+
+    def _save_image(self, image_url, save_path):
+        """Corps de download_image, sans la gestion des erreurs."""
+        if self.images is not None:
+            if self.images.save(image_url, save_path, self._stream) == IMAGE_UNCHANGED:
+                print(f"Image unchanged at {save_path}")
+            else:
+                print(f"Image saved to {save_path}")
+            return
+
+        content, not_modified = self._download(image_url)
+        # Image inchangée sur le serveur et déjà présente : inutile de réécrire le fichier
+        if not_modified and os.path.exists(save_path):
+            print(f"Image unchanged at {save_path}")
+            return
+        with open(save_path, 'wb') as image_file:
+            image_file.write(content)
+        print(f"Image saved to {save_path}")
+
+    def _extract_book(self, content, url):
+        """Extrait et normalise les données d'un livre à partir du contenu de sa page.
+
+        Avec parse_processes, l'analyse se fait dans un pool de processus : seul le contenu brut de la page
+        y est envoyé et seul l'enregistrement normalisé en revient.
+
+        Args:
+            content (bytes): Contenu HTML de la page du livre.
+            url (str): URL de la page du livre, utilisée dans les messages d'erreur.
+
+        Returns:
+            BookRecord: Données normalisées du livre, ou None si un champ obligatoire manque.
+        """
+        try:
+            # Une seule analyse de la page pour tous les champs, au lieu d'un parcours de la soup par propriété,
+            # dans un processus d'analyse si le pool est activé
+            if self.parse_pool is not None:
+                book_data, extract_time, normalize_time = self.parse_pool.extract(content)
+            else:
+                book_data, extract_time, normalize_time = extract_record(content, self.base_url, self.parser)
+            self.metrics.observe('extract_seconds', extract_time)
+            self.metrics.observe('normalize_seconds', normalize_time)
+            self.metrics.inc('books_extracted_total')
+            return book_data
+        
+        except KeyError as e:
+            self.metrics.inc('missing_field_errors_total')
+            print(f"❌ Missing data field: {e} for book at {url}")
+            return None
+
+    def image_path(self, book_data, category_name):
+        """Construit le chemin local de l'image d'un livre et crée son dossier si besoin.
+
+        Args:
+            book_data (BookRecord): Données normalisées du livre.
+            category_name (str): Nom de la catégorie.
+
+        Returns:
+            str: Chemin où sauvegarder l'image du livre.
+        """
+        image_folder = f'images/{category_name}'
+        os.makedirs(image_folder, exist_ok=True)
+        image_filename = f"{book_data.universal_product_code}_{book_data.title.replace(' ', '_').replace('/', '_')}.jpg"
+        return os.path.join(image_folder, image_filename)
+
+    def _book_from_content(self, content, url, category_name):
+        """Construit les données d'un livre à partir du contenu de sa page.
+
+        En mode incrémental, si la page est identique à celle de la dernière exécution,
+        l'enregistrement de l'index est réutilisé sans analyser la page. Hors mode incrémental,
+        la table d'empreintes joue le même rôle, sans suivre les changements.
+
+        Args:
+            content (bytes): Contenu HTML de la page du livre.
+            url (str): URL de la page du livre.
+            category_name (str): Nom de la catégorie, qui détermine le dossier de l'image. None pour celle du livre.
+
+        Returns:
+            tuple: Données normalisées du livre (BookRecord, ou None si la page est inexploitable) et
+            type de changement par rapport à l'exécution précédente (NEW, CHANGED, UNCHANGED, ou None hors mode incrémental).
+        """
+        page_hash = fingerprint = None
+        if self.index is not None:
+            page_hash = content_hash(content)
+            book_data = self.index.reuse(url, page_hash)
+            if book_data is not None:
+                return book_data, UNCHANGED
+        elif self.fingerprints is not None:
+            fingerprint = self.fingerprints.fingerprint(content)
+            data = self.fingerprints.reuse(PRODUCT, url, fingerprint)
+            if data is not None:
+                self.metrics.inc('parse_skipped_total')
+                book_data = BookRecord.from_dict(data)
+                book_data.image_path = self.image_path(book_data, category_name or book_data.category)
+                return book_data, None
+
+        book_data = self._extract_book(content, url)
+        if book_data is None:
+            return None, None
+        book_data.image_path = self.image_path(book_data, category_name or book_data.category)
+        if fingerprint is not None:
+            self.fingerprints.store(PRODUCT, url, fingerprint, book_data.to_dict())
+        change = self.index.update(url, page_hash, book_data) if self.index is not None else None
+        return book_data, change
+
+    def _image_needed(self, image_path):
+        """Indique s'il faut télécharger l'image : en mode incrémental, une image déjà présente est réutilisée."""
+        return self.index is None or not os.path.exists(image_path)
+
+    def _scrape_or_resume(self, url, category_name):
+        """Comme _scrape_book, mais réutilise le résultat enregistré dans la frontière si le livre a déjà été traité."""
+        if self.frontier is not None:
+            result = self.frontier.completed(url)
+            if result is not None:
+                return result
+        result = self._scrape_book(url, category_name)
+        if self.frontier is not None:
+            self.frontier.mark_book(url, *result)
+        return result
+
+    def _scrape_book(self, url, category_name):
+        """Scrape un livre, normalise ses données et télécharge son image.
+
+        Args:
+            url (str): URL de la page du livre.
+            category_name (str): Nom de la catégorie, qui détermine le dossier de l'image.
+
+        Returns:
+            tuple: Données normalisées du livre (ou None si la page n'a pas pu être exploitée) et type de changement
+            (FETCH_FAILED si la page n'a pas pu être téléchargée).
+        """
+        content = self._fetch(url, hold=True)
+        if content is None:
+            print(f"❌ Failed to retrieve book data from {url}")
+            return None, FETCH_FAILED
+        size = len(content)
+        try:
+            book_data, change = self._book_from_content(content, url, category_name)
+        finally:
+            # La page brute n'est plus utile une fois l'enregistrement extrait, pendant le téléchargement de l'image
+            content = None
+            self.memory.release(size)
+        if book_data is not None and self._image_needed(book_data.image_path):
+            self.download_image(book_data.image_url, book_data.image_path)
+        return book_data, change
+
+    def row_to_save(self, book_data, change):
+        """Sélectionne la ligne à écrire pour un livre dans le fichier de sa catégorie.
+
+        Args:
+            book_data (BookRecord): Données normalisées du livre, ou None si la page était inexploitable.
+            change (str): Type de changement par rapport à l'exécution précédente.
+
+        Returns:
+            dict: Données du livre (en mode delta, avec une colonne 'change' supplémentaire),
+            ou None si le livre ne doit pas être écrit.
+        """
+        if book_data is None:
+            return None
+        if not self.delta_only:
+            return book_data.to_dict()
+        return dict(book_data.to_dict(), change=change) if change in (NEW, CHANGED) else None
+
+    def open_sink(self, category_name):
+        """Ouvre le fichier de sortie horodaté d'une catégorie, au format output_format.
+
+        Args:
+            category_name (str): Nom de la catégorie.
+
+        Returns:
+            BookSink: Sink dans lequel écrire les lignes au fur et à mesure.
+        """
+        sink_class = SINKS[self.output_format]
+        category_folder = f'datas/{category_name}'
+        # Tous les fichiers d'une exécution portent l'horodatage de ses instantanés dans l'historique des prix
+        timestamp = self.scraped_at.replace('-', '').replace(':', '').replace('T', '_')
+        filename = f'{category_folder}/{category_name.lower().replace(" ", "_")}_books_data_{timestamp}.{sink_class.extension}'
+        return sink_class(filename, batch_size=self.batch_size)
+
+    def close_sink(self, sink, category_name):
+        """Finalise le fichier de sortie d'une catégorie, la marque comme terminée dans la frontière et enregistre ses instantanés dans l'historique.
+
+        Args:
+            sink (BookSink): Sink ouvert par open_sink.
+            category_name (str): Nom de la catégorie.
+        """
+        with self.metrics.timer('write_finalize_seconds'):
+            filename = sink.close()
+        if self.history is not None:
+            # Tous les livres de la catégorie sont enregistrés : son agrégat de l'historique peut être calculé
+            self.history.complete(category_name)
+        if self.frontier is not None:
+            self.frontier.mark_category_done(category_name)
+        if filename:
+            print(f"✅ Data saved to {filename}")
+        else:
+            print("❌ No books data to save.")
+
+    def _requeue_failed(self, results, urls, category_name):
+        """Renvoie les résultats dans l'ordre des URL, en retentant à la fin de la catégorie les livres dont la page n'a pas pu être téléchargée.
+
+        À partir du premier échec, les résultats suivants sont gardés en mémoire jusqu'à la nouvelle tentative,
+        pour que les lignes restent dans l'ordre des URL.
+
+        Args:
+            results (iterable): Résultats de _scrape_or_resume, dans l'ordre des URL.
+            urls (list): URL des livres.
+            category_name (str): Nom de la catégorie.
+
+        Yields:
+            tuple: Données du livre et type de changement.
+        """
+        held = []
+        for url, result in zip(urls, results):
+            if held or result[1] == FETCH_FAILED:
+                held.append((url, result))
+            else:
+                yield result
+        for url, result in held:
+            if result[1] == FETCH_FAILED:
+                self.metrics.inc('books_requeued_total')
+                print(f'🔁 Retrying {url}')
+                result = self._scrape_or_resume(url, category_name)
+            yield result
+
+    def _write_rows(self, sink, results):
+        """Écrit dans le sink les lignes des résultats, au fur et à mesure qu'ils arrivent."""
+        for book_data, change in results:
+            self.record_history(book_data)
+            self.write_row(sink, self.row_to_save(book_data, change))
+
+    def record_history(self, book_data):
+        """Ajoute l'instantané d'un livre à l'historique des prix (tous les livres, y compris inchangés en mode delta)."""
+        if self.history is not None and book_data is not None:
+            self.history.add(book_data)
+
+    def write_row(self, sink, row):
+        """Écrit une ligne dans le sink (rien si row vaut None), en mesurant le temps d'écriture."""
+        if row is None:
+            return
+        with self.metrics.timer('write_seconds'):
+            sink.write(row)
+        self.metrics.inc('rows_written_total')
+
+    def save_books_data(self, books_data, category_name):
+        """Sauvegarde les données des livres d'une catégorie dans un fichier horodaté.
+
+        Args:
+            books_data (list): Liste des données normalisées des livres (BookRecord).
+            category_name (str): Nom de la catégorie.
+        """
+        sink = self.open_sink(category_name)
+        for book_data in books_data:
+            self.record_history(book_data)
+            self.write_row(sink, book_data.to_dict())
+        self.close_sink(sink, category_name)
 
     # Méthode pour initier le scraping d'un livre
     def scrape_and_save_books(self, urls, category_name):
         """Scrape et sauvegarde les données de tous les livres d'une catégorie donnée.
 
+        Si max_workers est supérieur à 1, les livres sont traités en parallèle dans un pool de threads :
+        les téléchargements de pages, l'analyse HTML et les téléchargements d'images se chevauchent.
+        L'ordre des lignes du CSV reste celui des URL.
+
+        En mode incrémental (index défini), les pages inchangées ne sont pas analysées, les images déjà
+        présentes ne sont pas retéléchargées et, si delta_only est vrai, seuls les livres nouveaux ou
+        modifiés sont écrits.
+
+        Avec une frontière, les livres déjà traités par l'exécution reprise ne sont pas retéléchargés :
+        leurs données enregistrées sont réécrites telles quelles.
+
+        Les livres et les images qui n'ont pas pu être téléchargés malgré les nouvelles tentatives du
+        scheduler sont remis en file et retentés une dernière fois à la fin de la catégorie.
+
         Args:
             urls (list): Liste contenant les URL de tous les livres de la catégorie.
             category_name (str): Nom de la catégorie.
         
         Saves:
-            - Fichier CSV contenant les données de tous les livres de la catégorie.
+            - Fichier (CSV par défaut, voir output_format) contenant les données de tous les livres de la catégorie.
             - Images des livres dans un dossier spécifique.
         """
-        books_data = []
-        image_folder = f'images/{category_name}'
-        os.makedirs(image_folder, exist_ok=True)
+        # Les lignes sont écrites au fil de l'eau : un arrêt en cours de catégorie laisse les lots déjà écrits dans le fichier .part
+        sink = self.open_sink(category_name)
+        try:
+            self._write_rows(sink, self.iter_scraped_books(urls, category_name))
+            self.retry_failed_images()
+        except BaseException:
+            sink.abort()
+            raise
+        self.close_sink(sink, category_name)
 
-        for url in urls:
-            self.get_soup(url)
-            if not self._validate_soup():
-                print(f"❌ Failed to retrieve book data from {url}")
-                continue
-            try:
+    def iter_scraped_books(self, urls, category_name):
+        """Scrape des livres (max_workers à la fois) et renvoie leurs résultats dans l'ordre des URL, au fur et à mesure.
 
-                book_data = { 
-                    'title': self.title,
-                    'category': self.category,
-                    'product_description': self.product_description,
-                    'review_rating': self.review_rating,
-                    'image_url': self.image_url,
-                    'price_including_tax': self.table['Price (incl. tax)'],
-                    'price_excluding_tax': self.table['Price (excl. tax)'],
-                    'number_available': self.table['Availability'],
-                    'universal_product_code (upc)': self.table['UPC'],
-                }
-                # On applique la normalisation des données
-                self.normalize_data(book_data)
-                
-                image_filename = f"{book_data['universal_product_code']}_{book_data['title'].replace(' ', '_').replace('/', '_')}.jpg"
-                image_path = os.path.join(image_folder, image_filename)
-                self.download_image(book_data['image_url'], image_path)
-                
-                book_data['image_path'] = image_path
-                books_data.append(book_data)
-            
-            except KeyError as e:
-                print(f"❌ Missing data field: {e} for book at {url}")
-                continue
+        Les livres dont la page n'a pas pu être téléchargée sont retentés à la fin (voir _requeue_failed).
 
-        if books_data:
-            os.makedirs('datas', exist_ok=True)
-            category_folder = f'datas/{category_name}'
-            os.makedirs(category_folder, exist_ok=True)
-            timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'{category_folder}/{category_name.lower().replace(" ", "_")}_books_data_{timestamp}.csv'
-            df = pd.DataFrame(books_data)
-            df.to_csv(filename, index=False, encoding='utf-8')
-            print(f"✅ Data saved to {filename}")
+        Args:
+            urls (list): URL des livres.
+            category_name (str): Nom de la catégorie, qui détermine le dossier des images.
+
+        Yields:
+            tuple: Données du livre (ou None) et type de changement.
+        """
+        if self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(lambda url: self._scrape_or_resume(url, category_name), urls)
+                yield from self._requeue_failed(results, urls, category_name)
         else:
-            print("❌ No books data to save.")
+            results = (self._scrape_or_resume(url, category_name) for url in urls)
+            yield from self._requeue_failed(results, urls, category_name)
+
+    def refresh_books(self, urls, priority, output_name='refresh'):
+        """Rescrape une liste de livres de n'importe quelles catégories et sauvegarde leurs données dans un seul fichier.
+
+        Les livres sont traités par max_workers threads, avec la session et le scheduler partagés. Leurs requêtes
+        ont la priorité priority dans le scheduler : avec URGENT, elles passent devant celles d'un crawl complet
+        qui tourne en même temps sur le même BookScraper. Chaque image est rangée dans le dossier de la catégorie du livre.
+
+        Args:
+            urls (list): URL des pages des livres.
+            priority (int): Priorité des requêtes dans le scheduler (URGENT ou NORMAL de scraper.rate_limiter).
+            output_name (str): Nom du dossier et du fichier de sortie. Par défaut, 'refresh'.
+
+        Saves:
+            - Fichier (CSV par défaut, voir output_format) contenant les données de tous les livres de la liste.
+            - Images des livres absentes du dossier de leur catégorie.
+
+        Returns:
+            int: Nombre de livres dont les données n'ont pas pu être lues.
+        """
+        failed = 0
+
+        def scrape(url):
+            with self.scheduler.priority(priority):
+                return self._scrape_book(url, None)
+
+        def count_failures(results):
+            nonlocal failed
+            for book_data, change in results:
+                failed += book_data is None
+                yield book_data, change
+
+        sink = self.open_sink(output_name)
+        try:
+            # Le thread courant écrit les lignes et retente les échecs à la fin, avec la même priorité
+            with self.scheduler.priority(priority), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(scrape, urls)
+                self._write_rows(sink, count_failures(self._requeue_failed(results, urls, None)))
+                self.retry_failed_images()
+        except BaseException:
+            sink.abort()
+            raise
+        self.close_sink(sink, output_name)
+        return failed
+
 
+def stage_table(stage_stats):
+    """Construit le tableau récapitulatif du débit de chaque étape du pipeline.
 
+    Args:
+        stage_stats (list): StageStats de chaque étape, dans l'ordre du pipeline.
 
-def main():
-    """Fonction principale pour lancer le scraping du site web et sauvegarder les données des livres et les images.
+    Returns:
+        rich.table.Table: Tableau à afficher sous le récapitulatif des catégories.
     """
-    scraper = BookScraper()
-    category_urls = scraper.get_all_categories_urls()
+    from rich.table import Table
 
-    if not category_urls:
-        print('❌ No category URLs found. Exiting.')
-        return
-    else:
-        print(f'🔎 Number of categories found: {len(category_urls)}')
-        print(f'🏁 Starting scraping process\n')
+    table = Table(title='Pipeline Stages', show_header=True, header_style='bold magenta')
+    table.add_column('Stage', style='dim', width=25)
+    table.add_column('Workers', justify='right')
+    table.add_column('Items', justify='right')
+    table.add_column('Items/s', justify='right')
+    table.add_column('Busy (s)', justify='right')
+    table.add_column('Blocked (s)', justify='right')
+    for stats in stage_stats:
+        table.add_row(stats.name, str(stats.workers), str(stats.items), f'{stats.throughput:.1f}', f'{stats.busy_time:.2f}', f'{stats.blocked_time:.2f}')
+    return table
 
-    console = Console()
-    summary_table = Table(title='Summary of Scraping', show_header=True, header_style='bold magenta', show_footer=True, footer_style='bold green')
-    summary_table.add_column('Category Name', style='dim', width=25)
-    summary_table.add_column('Number of Books', justify='right')
-    summary_table.add_column('Time Taken (s)', justify='right')
-    total_books = 0
-    total_time = 0
-    
 
-    for category_name, category_url in category_urls.items():
-        start_time = time.time()
-        print(f'🎣 Scraping category: {category_name}')
-        books_urls = scraper.get_category_books_urls(category_url)
-        num_books = len(books_urls)
-        total_books += num_books
-        print(f'📚 Number of books found: {num_books}')
-        
-        if books_urls:
-            scraper.scrape_and_save_books(books_urls, category_name)
-            elapsed_time = time.time() - start_time
-            total_time += elapsed_time
-            print(f'📚 {category_name} category processing done in {elapsed_time:.2f} seconds\n')
-            summary_table.add_row(category_name, str(num_books), f'{elapsed_time:.2f}')
+# Sous-commandes de la ligne de commande; sans sous-commande, c'est un crawl complet
+COMMANDS = ('crawl', 'category', 'book', 'refresh', 'coordinator', 'worker', 'merge', 'history')
+# Sous-commandes du crawl distribué, qui partagent une file de tâches
+DISTRIBUTED_COMMANDS = ('coordinator', 'worker', 'merge')
+
+
+def parse_args(argv=None):
+    """Analyse les arguments de la ligne de commande.
+
+    Sans sous-commande (ou si le premier argument est une option), la commande est crawl, comme avant
+    l'ajout des sous-commandes : `python book_scraper.py --workers 8` lance toujours un crawl complet.
+
+    Args:
+        argv (list): Arguments à analyser. Par défaut, None pour utiliser sys.argv.
+
+    Returns:
+        argparse.Namespace: Arguments analysés, avec la sous-commande dans command.
+    """
+    common_options = argparse.ArgumentParser(add_help=False)
+    common_options.add_argument('--base-url', default='https://books.toscrape.com/', help='URL du site à scraper, par exemple celle du serveur de benchmarks/fixture_server.py.')
+    common_options.add_argument('--parser', choices=PARSERS, default=None, help="Backend d'analyse HTML. Par défaut, le plus rapide installé parmi ceux de BeautifulSoup.")
+    common_options.add_argument('--timeout', type=float, default=30.0, metavar='SECONDS', help="Timeout de connexion et de lecture de chaque requête, en secondes.")
+
+    crawl_options = argparse.ArgumentParser(add_help=False, parents=[common_options])
+    crawl_options.add_argument('--workers', type=int, default=1, help='Nombre de livres traités en parallèle (1 = séquentiel).')
+    crawl_options.add_argument('--max-connections-per-host', type=int, default=10, help='Nombre maximum de requêtes simultanées vers un même hôte.')
+    crawl_options.add_argument('--rate', type=float, default=None, metavar='REQ_PER_SEC', help='Nombre maximum de requêtes par seconde vers un même hôte. Par défaut, pas de limite.')
+    crawl_options.add_argument('--retries', type=int, default=3, help="Nombre de nouvelles tentatives d'une requête en échec (erreur de connexion, timeout, 429 ou 5xx).")
+    crawl_options.add_argument('--parse-processes', type=int, default=0, help="Nombre de processus qui analysent les pages produit (0 = analyse dans les threads).")
+    crawl_options.add_argument('--http-cache', default='.http_cache', metavar='DIR', help='Dossier du cache HTTP (requêtes conditionnelles ETag / Last-Modified).')
+    crawl_options.add_argument('--http-cache-size', type=int, default=512, metavar='MB', help='Taille maximale du cache HTTP en Mo, au-delà les entrées les moins récemment utilisées sont supprimées.')
+    crawl_options.add_argument('--no-http-cache', action='store_true', help='Désactive le cache HTTP.')
+    crawl_options.add_argument('--incremental', action='store_true', help="Mode incrémental : réutilise les pages et images inchangées depuis l'exécution précédente.")
+    crawl_options.add_argument('--index-file', default='.crawl_index.json', help='Mode incrémental : fichier de l\'index des livres (par UPC).')
+    crawl_options.add_argument('--delta', action='store_true', help='Mode incrémental : écrit uniquement les livres nouveaux ou modifiés au lieu de l\'instantané complet.')
+    crawl_options.add_argument('--output-format', choices=list(SINKS), default='csv', help='Format des fichiers de données (parquet nécessite pyarrow).')
+    crawl_options.add_argument('--batch-size', type=int, default=100, help='Nombre de lignes écrites à la fois dans les fichiers de données.')
+    crawl_options.add_argument('--resume', action='store_true', help="Reprend le crawl là où l'exécution précédente s'est arrêtée, sans retélécharger les pages déjà traitées.")
+    crawl_options.add_argument('--frontier-file', default='.crawl_frontier.sqlite', help="Base SQLite où l'avancement du crawl est enregistré.")
+    crawl_options.add_argument('--history-file', default='.price_history.sqlite', help="Base SQLite de l'historique des prix et des stocks, complétée à chaque exécution.")
+    crawl_options.add_argument('--no-history', action='store_true', help="N'enregistre pas cette exécution dans l'historique des prix.")
+    crawl_options.add_argument('--fingerprint-file', default='.page_fingerprints.sqlite', help="Base SQLite des empreintes des pages déjà analysées : une page identique à la dernière fois n'est pas réanalysée.")
+    crawl_options.add_argument('--no-fingerprints', action='store_true', help='Analyse toutes les pages, même celles qui n\'ont pas changé depuis la dernière exécution.')
+    crawl_options.add_argument('--no-image-store', action='store_true', help='Écrit un fichier par livre au lieu de liens vers le stockage des images dédupliqué par contenu.')
+    crawl_options.add_argument('--thumbnails', metavar='LxH', help='Génère des miniatures des images dans images/.thumbnails (nécessite Pillow), par exemple 150x200.')
+    crawl_options.add_argument('--thumbnail-workers', type=int, default=2, help='Nombre de threads qui génèrent les miniatures.')
+    crawl_options.add_argument('--max-inflight-mb', type=float, default=None, metavar='MB', help="Mode mémoire bornée : plafond des pages téléchargées et pas encore analysées, en Mo. "
+                                                                                                   "Les téléchargements attendent que l'analyse libère de la place. Par défaut, pas de limite.")
+    crawl_options.add_argument('--metrics-out', metavar='FILE', help='Exporte les métriques du crawl (compteurs, latences p50/p95/p99) en fin d\'exécution : texte Prometheus si FILE finit par .prom, JSON sinon.')
+    crawl_options.add_argument('--pipeline', action='store_true', help='Enchaîne les catégories dans un pipeline producteur/consommateur au lieu de les traiter une par une.')
+    crawl_options.add_argument('--listing-workers', type=int, default=2, help='Pipeline : nombre de catégories paginées en parallèle.')
+    crawl_options.add_argument('--fetch-workers', type=int, default=8, help='Pipeline : nombre de pages produit téléchargées en parallèle.')
+    crawl_options.add_argument('--parse-workers', type=int, default=2, help='Pipeline : nombre de threads d\'analyse des pages produit.')
+    crawl_options.add_argument('--image-workers', type=int, default=8, help='Pipeline : nombre d\'images téléchargées en parallèle.')
+    crawl_options.add_argument('--queue-size', type=int, default=64, help='Pipeline : capacité de chaque file entre deux étapes.')
+
+    queue_options = argparse.ArgumentParser(add_help=False)
+    queue_options.add_argument('--queue-dir', default='.crawl_queue', metavar='DIR', help='Crawl distribué : dossier de la file de tâches (SQLite) et des sorties partielles des workers.')
+    queue_options.add_argument('--visibility-timeout', type=float, default=60.0, metavar='SECONDS', help="Crawl distribué : durée d'un bail sur une tâche, au-delà de laquelle un autre worker la reprend.")
+    queue_options.add_argument('--max-attempts', type=int, default=3, help="Crawl distribué : nombre de tentatives d'une tâche avant de l'abandonner.")
+
+    parser = argparse.ArgumentParser(description='Scrape les livres de Books to Scrape et sauvegarde leurs données et images.')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.add_parser('crawl', parents=[crawl_options], help='Scrape toutes les catégories (commande par défaut).')
+    category = commands.add_parser('category', parents=[crawl_options], help='Scrape seulement les catégories nommées, avec les mêmes options que crawl.')
+    category.add_argument('names', nargs='+', metavar='NAME', help='Nom d\'une catégorie, par exemple "Mystery" ou "historical fiction" (sans tenir compte de la casse).')
+    book = commands.add_parser('book', parents=[common_options], help='Affiche les données d\'un ou plusieurs livres, sans parcourir les catégories.')
+    book.add_argument('urls', nargs='+', metavar='URL', help='URL de la page du livre, absolue ou relative à --base-url (par exemple catalogue/xxx_1/index.html).')
+    book.add_argument('--json', action='store_true', help='Affiche une ligne JSON par livre au lieu d\'un tableau.')
+    refresh = commands.add_parser('refresh', parents=[crawl_options], help='Rescrape en priorité une liste de livres (URL ou UPC) et écrit leurs données dans un seul fichier.')
+    refresh.add_argument('targets', metavar='FILE', help="Fichier avec une URL de page produit (absolue ou relative à --base-url) ou un UPC par ligne, '-' pour l'entrée standard. "
+                                                         "Les UPC sont retrouvés dans l'index de la dernière exécution (--index-file).")
+    refresh.add_argument('--with-crawl', action='store_true', help='Lance en même temps un crawl complet, dont les requêtes passent après celles des livres à rafraîchir. '
+                                                                   'Ce crawl partage l\'index : il est incrémental, comme avec --incremental.')
+    coordinator = commands.add_parser('coordinator', parents=[crawl_options, queue_options], help='Crawl distribué : remplit la file avec les catégories, attend les workers puis fusionne leurs sorties.')
+    coordinator.add_argument('--local-workers', type=int, default=0, metavar='N', help='Nombre de processus worker lancés sur cette machine (0 = attendre des workers lancés à part).')
+    coordinator.add_argument('--reset', action='store_true', help="Vide la file avant de la remplir, au lieu de reprendre celle d'un crawl distribué interrompu.")
+    commands.add_parser('worker', parents=[crawl_options, queue_options], help='Crawl distribué : traite les tâches de la file jusqu\'à ce qu\'elle soit vide.')
+    commands.add_parser('merge', parents=[crawl_options, queue_options], help='Crawl distribué : fusionne les sorties partielles en un fichier par catégorie (fait aussi par coordinator).')
+    commands.add_parser('history', add_help=False, help='Interroge l\'historique des prix (voir book_scraper.py history -h).')
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] == 'history':
+        # Les arguments sont transmis tels quels à scraper/history.py, qui a sa propre aide (book_scraper.py history -h)
+        return argparse.Namespace(command='history', history_args=argv[1:])
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['crawl', *argv]
+    args = parser.parse_args(argv)
+    if args.command not in ('crawl', 'category', 'refresh', *DISTRIBUTED_COMMANDS):
+        return args
+    if args.command in DISTRIBUTED_COMMANDS and (args.incremental or args.delta or args.resume or args.pipeline):
+        parser.error('--incremental, --delta, --resume et --pipeline ne sont pas disponibles en crawl distribué (la file de tâches sert de frontière)')
+    if args.command in DISTRIBUTED_COMMANDS:
+        if args.thumbnails:
+            parser.error("--thumbnails n'est pas disponible en crawl distribué (il nécessite le stockage des images)")
+        # L'index du cache HTTP et le manifeste des images sont réécrits en entier par chaque processus à sa fermeture :
+        # avec plusieurs workers, le dernier l'emporterait et les autres entrées seraient perdues
+        args.no_http_cache = args.no_image_store = True
+    if args.output_format == 'parquet' and not SINKS['parquet'].available():
+        parser.error('le format parquet nécessite pyarrow (pip install pyarrow)')
+    if args.thumbnails:
+        if args.no_image_store:
+            parser.error('--thumbnails nécessite le stockage des images (sans --no-image-store)')
+        if not ImageStore.thumbnails_available():
+            parser.error('--thumbnails nécessite Pillow (pip install Pillow)')
+        try:
+            args.thumbnails = tuple(int(size) for size in args.thumbnails.lower().split('x'))
+        except ValueError:
+            args.thumbnails = ()
+        if len(args.thumbnails) != 2:
+            parser.error('--thumbnails attend une taille de la forme LxH, par exemple 150x200')
+    return args
+
+
+def select_categories(category_urls, names):
+    """Garde les catégories demandées, dans l'ordre du site, en ignorant la casse.
+
+    Args:
+        category_urls (dict): Noms et URL de toutes les catégories.
+        names (list): Noms des catégories demandées.
+
+    Returns:
+        dict: Noms et URL des catégories trouvées.
+    """
+    wanted = {name.casefold() for name in names}
+    selected = {name: url for name, url in category_urls.items() if name.casefold() in wanted}
+    for name in sorted(wanted - {name.casefold() for name in selected}):
+        print(f'❌ Unknown category: {name}')
+    return selected
+
+
+def scrape_books(args):
+    """Sous-commande book : télécharge, analyse et affiche un ou plusieurs livres.
+
+    Seuls requests et le backend d'analyse sont chargés : ni scheduler, ni cache, ni frontière, ni rich.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+
+    Returns:
+        int: 0 si tous les livres ont été lus, 1 sinon.
+    """
+    import requests
+
+    status = 0
+    with requests.Session() as session:
+        for url in args.urls:
+            url = urljoin(args.base_url, url)
+            try:
+                response = session.get(url, timeout=args.timeout)
+                response.raise_for_status()
+                book = BookRecord.from_fields(book_fields(parse_product_page(response.content, args.base_url, args.parser)))
+            except requests.RequestException as e:
+                print(f'❌ Error fetching URL {url}: {e}')
+                status = 1
+                continue
+            except (IndexError, KeyError, ValueError) as e:
+                # Page sans les champs d'une page produit (page de catégorie, par exemple)
+                print(f'❌ Could not read book data from {url}: {e!r}')
+                status = 1
+                continue
+            book_data = {'product_page_url': url, **book.to_dict()}
+            del book_data['image_path']
+            if args.json:
+                print(json.dumps(book_data, ensure_ascii=False))
+            else:
+                width = max(map(len, book_data))
+                print('\n'.join(f'{key:<{width}}  {value}' for key, value in book_data.items()) + '\n')
+    return status
+
+
+def build_scraper(args, index=None, frontier=True, history=True, rollup=True):
+    """Construit le BookScraper des sous-commandes de crawl à partir de leurs options.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+        index (CrawlIndex): Index à utiliser. Par défaut, None pour en ouvrir un seulement avec --incremental.
+        frontier (bool): Ouvre la frontière du crawl. Par défaut, True.
+        history (bool): Ouvre l'historique des prix, sauf avec --no-history. Par défaut, True.
+        rollup (bool): Met à jour les agrégats par catégorie de l'historique. Par défaut, True ; False quand seuls
+            quelques livres sont scrapés, pour ne pas fausser les tendances par catégorie.
+
+    Returns:
+        BookScraper: Scraper configuré, à fermer avec close.
+    """
+    from scraper.rate_limiter import RequestScheduler
+
+    cache = None if args.no_http_cache else HttpCache(args.http_cache, max_bytes=args.http_cache_size * 1024 * 1024)
+    if index is None and args.incremental:
+        index = CrawlIndex(args.index_file)
+    images = None if args.no_image_store else ImageStore('images', thumbnail_size=args.thumbnails, thumbnail_workers=args.thumbnail_workers)
+    history = None if args.no_history or not history else PriceHistory(args.history_file, rollup=rollup)
+    fingerprints = None if args.no_fingerprints else FingerprintTable(args.fingerprint_file)
+    metrics = Metrics()
+    scheduler = RequestScheduler(args.max_connections_per_host, rate=args.rate, retries=args.retries, timeout=args.timeout, metrics=metrics)
+    return BookScraper(base_url=args.base_url, max_workers=args.workers, max_connections_per_host=args.max_connections_per_host, parser=args.parser,
+                       cache=cache, index=index, delta_only=args.delta, output_format=args.output_format, batch_size=args.batch_size,
+                       frontier=Frontier(args.frontier_file, resume=args.resume) if frontier else None, images=images, metrics=metrics,
+                       scheduler=scheduler, parse_processes=args.parse_processes, history=history,
+                       memory=ByteBudget(int(args.max_inflight_mb * 1024 * 1024) if args.max_inflight_mb else None), fingerprints=fingerprints)
+
+
+def crawl(args, scraper=None):
+    """Sous-commandes crawl et category : scrape les catégories et sauvegarde les données des livres et les images.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+        scraper (BookScraper): Scraper partagé avec une autre tâche (refresh --with-crawl), fermé par l'appelant.
+            Par défaut, None pour en construire un avec build_scraper.
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    shared = scraper is not None
+    if not shared:
+        scraper = build_scraper(args)
+    # La fermeture enregistre le cache, l'index et la frontière, y compris si le crawl est interrompu
+    try:
+        category_urls = scraper.list_categories()
+        if args.command == 'category':
+            category_urls = select_categories(category_urls, args.names)
+
+        if not category_urls:
+            print('❌ No category URLs found. Exiting.')
+            return
         else:
-            print(f'❗ No books found for {category_name}. Skipping...\n')
-    
+            print(f'🔎 Number of categories found: {len(category_urls)}')
+            print(f'🏁 Starting scraping process\n')
+
+        console = Console()
+        summary_table = Table(title='Summary of Scraping', show_header=True, header_style='bold magenta', show_footer=True, footer_style='bold green')
+        summary_table.add_column('Category Name', style='dim', width=25)
+        summary_table.add_column('Number of Books', justify='right')
+        summary_table.add_column('Time Taken (s)', justify='right')
+        total_books = 0
+        total_time = 0
+
+        if args.pipeline:
+            pipeline = CategoryPipeline(scraper, listing_workers=args.listing_workers, fetch_workers=args.fetch_workers,
+                                        # Chaque thread d'analyse attend un processus : il en faut au moins un par processus
+                                        parse_workers=max(args.parse_workers, args.parse_processes), image_workers=args.image_workers, queue_size=args.queue_size)
+            start_time = time.time()
+            results = pipeline.run(category_urls)
+            # Les catégories se chevauchent : le total est la durée réelle du pipeline et non la somme des lignes
+            total_time = time.time() - start_time
+            for category_name, (num_books, elapsed_time) in results.items():
+                total_books += num_books
+                summary_table.add_row(category_name, str(num_books), f'{elapsed_time:.2f}')
+        else:
+            for category_name, category_url in category_urls.items():
+                if scraper.category_done(category_name):
+                    print(f'⏭️  {category_name} already saved by the resumed run. Skipping...\n')
+                    continue
+                start_time = time.time()
+                print(f'🎣 Scraping category: {category_name}')
+                books_urls = scraper.list_category_books(category_name, category_url)
+                num_books = len(books_urls)
+                total_books += num_books
+                print(f'📚 Number of books found: {num_books}')
+
+                if books_urls:
+                    scraper.scrape_and_save_books(books_urls, category_name)
+                    elapsed_time = time.time() - start_time
+                    total_time += elapsed_time
+                    print(f'📚 {category_name} category processing done in {elapsed_time:.2f} seconds\n')
+                    summary_table.add_row(category_name, str(num_books), f'{elapsed_time:.2f}')
+                else:
+                    print(f'❗ No books found for {category_name}. Skipping...\n')
+    finally:
+        if not shared:
+            scraper.close()
+
     summary_table.columns[1].footer = str(total_books)
     summary_table.columns[2].footer = f'{total_time:.2f}'
+    parts = (scraper.scheduler, scraper.cache, scraper.index, scraper.images, scraper.history, scraper.fingerprints,
+             scraper.frontier if args.resume else None, scraper.memory)
+    summary_table.caption = '\n'.join(part.summary() for part in parts if part is not None)
     console.print(summary_table)
+    if args.pipeline:
+        console.print(stage_table(pipeline.stage_stats))
+    if args.metrics_out:
+        scraper.metrics.export(args.metrics_out)
+        print(f'📈 Metrics saved to {args.metrics_out}')
+
+
+def read_targets(path):
+    """Lit le fichier de la sous-commande refresh : une URL ou un UPC par ligne, lignes vides et commentaires (#) ignorés.
+
+    Args:
+        path (str): Chemin du fichier, ou '-' pour l'entrée standard.
+
+    Returns:
+        list: Lignes utiles du fichier, sans espaces autour.
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8') as targets_file:
+            lines = targets_file.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def resolve_targets(targets, index, base_url):
+    """Convertit les cibles de la sous-commande refresh en URL de pages produit, sans doublons et dans l'ordre du fichier.
+
+    Une cible qui contient un '/' est une URL, absolue ou relative à base_url. Les autres sont des UPC,
+    cherchés dans l'index de la dernière exécution; ceux qui n'y sont pas sont signalés et ignorés.
+    Une URL déjà dans l'index est remplacée par celle qui y est enregistrée (celle du crawl), quelle que soit
+    son écriture : un livre désigné par son URL et par son UPC n'est rafraîchi qu'une fois, et l'index garde
+    la même URL.
+
+    Args:
+        targets (list): Lignes de read_targets.
+        index (CrawlIndex): Index de la dernière exécution.
+        base_url (str): URL du site.
+
+    Returns:
+        tuple: URL des pages des livres à rafraîchir, et UPC introuvables dans l'index.
+    """
+    urls, unknown = [], []
+    for target in targets:
+        if '/' in target:
+            url = urljoin(base_url, target)
+            urls.append(index.known_url(url) or url)
+            continue
+        url = index.url_of(target)
+        if url is None:
+            print(f'❌ Unknown UPC (not in {index.path}): {target}')
+            unknown.append(target)
+        else:
+            urls.append(url)
+    return list(dict.fromkeys(urls)), unknown
+
+
+def refresh(args):
+    """Sous-commande refresh : rescrape en priorité une liste de livres et sauvegarde leurs données dans un seul fichier.
+
+    L'index de la dernière exécution sert à retrouver les UPC et est mis à jour, comme en mode incrémental :
+    une page inchangée n'est pas réanalysée et une image déjà présente n'est pas retéléchargée. Avec --with-crawl,
+    un crawl complet tourne en arrière-plan sur le même scraper (session, scheduler, cache, index), et les requêtes
+    des livres à rafraîchir passent devant les siennes : ce crawl est donc incrémental, comme avec --incremental.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+
+    Returns:
+        int: 0 si tous les livres ont été rafraîchis, 1 sinon.
+    """
+    from scraper.rate_limiter import URGENT
+
+    index = CrawlIndex(args.index_file)
+    try:
+        targets = read_targets(args.targets)
+    except OSError as e:
+        print(f'❌ Could not read {args.targets}: {e}')
+        return 1
+    urls, unknown = resolve_targets(targets, index, args.base_url)
+    if not urls and not args.with_crawl:
+        print('❌ No books to refresh. Exiting.')
+        return 1
+
+    # Sans crawl, la frontière n'est pas ouverte : celle d'un crawl interrompu reste disponible pour --resume
+    # Sans --with-crawl, seuls quelques livres de chaque catégorie sont relus : pas d'agrégat par catégorie
+    scraper = build_scraper(args, index=index, frontier=args.with_crawl, rollup=args.with_crawl)
+    background = None
+    failed = 0
+    try:
+        if args.with_crawl:
+            background = threading.Thread(target=crawl, args=(args, scraper), name='background-crawl', daemon=True)
+            background.start()
+        if urls:
+            print(f'⚡ Refreshing {len(urls)} books')
+            start_time = time.time()
+            failed = scraper.refresh_books(urls, URGENT)
+            print(f'⚡ {len(urls)} books refreshed in {time.time() - start_time:.2f} seconds\n')
+        if background is not None:
+            background.join()
+    finally:
+        scraper.close()
+    return 1 if unknown or failed else 0
+
+
+def open_queue(args):
+    """Ouvre la file de tâches du crawl distribué, dans --queue-dir."""
+    from scraper.work_queue import WorkQueue
+
+    return WorkQueue(os.path.join(args.queue_dir, 'queue.sqlite'), max_attempts=args.max_attempts)
+
+
+def worker(args):
+    """Sous-commande worker : traite les tâches de la file du crawl distribué jusqu'à ce qu'elle soit vide.
+
+    Le worker peut tourner sur la même machine que le coordinateur (--local-workers) ou être lancé à part,
+    avec le même dossier de travail et le même --queue-dir. L'historique des prix n'est pas ouvert : les
+    instantanés sont enregistrés une seule fois, par la fusion.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande (ceux du coordinateur pour un worker local).
+
+    Returns:
+        int: 0.
+    """
+    import socket
+    from scraper.distributed import run_worker
+
+    worker_id = f'{socket.gethostname()}-{os.getpid()}'
+    queue = open_queue(args)
+    scraper = build_scraper(args, frontier=False, history=False)
+    try:
+        print(f'👷 Worker {worker_id} started')
+        processed = run_worker(scraper, queue, worker_id, os.path.join(args.queue_dir, 'parts'), args.visibility_timeout)
+    finally:
+        scraper.close()
+        queue.close()
+    print(f'👷 Worker {worker_id} done: {processed} tasks processed')
+    return 0
+
+
+def merge_outputs(args, scraper=None, queue=None):
+    """Sous-commande merge : fusionne les sorties partielles des workers en un fichier par catégorie.
+
+    Les livres sont ajoutés à l'historique des prix une seule fois, lors de la première fusion d'une file terminée.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+        scraper (BookScraper): Scraper du coordinateur. Par défaut, None pour en construire un.
+        queue (WorkQueue): File du coordinateur. Par défaut, None pour ouvrir celle de --queue-dir.
+
+    Returns:
+        dict: Nombre de livres écrits pour chaque catégorie.
+    """
+    from scraper.distributed import HISTORY_MARKER, merge
+
+    own_scraper, own_queue = scraper is None, queue is None
+    scraper = scraper or build_scraper(args, frontier=False)
+    queue = queue or open_queue(args)
+    parts_dir = os.path.join(args.queue_dir, 'parts')
+    marker = os.path.join(parts_dir, HISTORY_MARKER)
+    try:
+        if queue.unfinished():
+            print(f'❗ {queue.unfinished()} tasks are not finished yet: their books are left out')
+        # Une nouvelle fusion des mêmes sorties partielles ne les ajoute pas une deuxième fois à l'historique, et ses
+        # fichiers portent l'horodatage de la première : history import les reconnaît comme la même exécution
+        merged = os.path.exists(marker)
+        if merged:
+            with open(marker, encoding='utf-8') as marker_file:
+                scraper.scraped_at = marker_file.read().strip()
+        record_history = scraper.history is not None and not queue.unfinished() and not merged
+        if scraper.history is not None and not record_history:
+            print('❗ Price history not updated: these partial outputs are already recorded, or not finished yet')
+        results = merge(scraper, queue, parts_dir, record_history)
+        if not merged and not queue.unfinished():
+            os.makedirs(parts_dir, exist_ok=True)
+            with open(marker, 'w', encoding='utf-8') as marker_file:
+                marker_file.write(scraper.scraped_at)
+        return results
+    finally:
+        if own_scraper:
+            scraper.close()
+        if own_queue:
+            queue.close()
+
+
+def coordinator(args):
+    """Sous-commande coordinator : crawl distribué sur plusieurs processus ou machines.
+
+    Le coordinateur vide la file d'un crawl terminé et ses sorties partielles, puis y met une tâche par catégorie (sauf
+    si la file d'un crawl interrompu, avec des tâches en attente ou en cours, est reprise),
+    lance --local-workers processus worker, attend que toutes les tâches soient terminées, puis fusionne les
+    sorties partielles dans les mêmes fichiers par catégorie que le crawl complet. Si tous les workers locaux
+    s'arrêtent avant la fin, le coordinateur termine lui-même les tâches restantes.
+
+    Args:
+        args (argparse.Namespace): Arguments de la sous-commande.
+    """
+    import multiprocessing
+    from rich.console import Console
+    from rich.table import Table
+    from scraper.distributed import clear, run_worker, seed
+
+    queue = open_queue(args)
+    scraper = build_scraper(args, frontier=False)
+    processes = []
+    try:
+        start_time = time.time()
+        if args.reset or not queue.unfinished():
+            # Seule une file interrompue est reprise : celle d'un crawl terminé est vidée, avec ses sorties partielles
+            clear(queue, os.path.join(args.queue_dir, 'parts'))
+            category_urls = scraper.list_categories()
+            if not category_urls:
+                print('❌ No category URLs found. Exiting.')
+                queue.close()
+                return
+            print(f'🔎 Number of categories found: {len(category_urls)}')
+            seed(queue, category_urls)
+        else:
+            print(f'🔁 Resuming the work queue in {args.queue_dir}: {queue.unfinished()} tasks unfinished')
+
+        # spawn, comme le pool d'analyse : les processus ne partagent rien avec le coordinateur à part la file sur disque
+        context = multiprocessing.get_context('spawn')
+        for _ in range(args.local_workers):
+            process = context.Process(target=worker, args=(args,))
+            process.start()
+            processes.append(process)
+
+        last_report = 0.0
+        while queue.unfinished():
+            if processes and not any(process.is_alive() for process in processes):
+                print('❗ Every local worker has stopped: the coordinator finishes the remaining tasks')
+                run_worker(scraper, queue, f'coordinator-{os.getpid()}', os.path.join(args.queue_dir, 'parts'), args.visibility_timeout)
+                break
+            if time.time() - last_report >= 5.0:
+                counts = queue.counts()
+                print(f"⏳ Tasks: {counts['done']} done, {counts['leased']} leased, {counts['pending']} pending, {counts['failed']} failed")
+                last_report = time.time()
+            time.sleep(0.5)
+        for process in processes:
+            process.join()
+        print(f'🧩 Merging the partial outputs of {args.queue_dir}')
+        results = merge_outputs(args, scraper, queue)
+        total_time = time.time() - start_time
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        scraper.close()
+
+    summary_table = Table(title='Summary of Distributed Scraping', show_header=True, header_style='bold magenta', show_footer=True, footer_style='bold green')
+    summary_table.add_column('Category Name', style='dim', width=25)
+    summary_table.add_column('Number of Books', justify='right', footer=str(sum(results.values())))
+    for category_name, num_books in results.items():
+        summary_table.add_row(category_name, str(num_books))
+    summary_table.caption = '\n'.join([f'{args.local_workers} local workers, {total_time:.2f} s', queue.summary()]
+                                      + ([scraper.history.summary()] if scraper.history is not None else []))
+    queue.close()
+    Console().print(summary_table)
+
+
+def main(argv=None):
+    """Fonction principale : lance la sous-commande demandée (par défaut, le crawl complet du site).
+
+    Args:
+        argv (list): Arguments de la ligne de commande. Par défaut, None pour utiliser sys.argv.
+
+    Returns:
+        int: Code de sortie de la sous-commande (None pour un succès).
+    """
+    args = parse_args(argv)
+    if args.command == 'history':
+        from scraper.history import main as history_main
+        return history_main(args.history_args)
+    if args.command == 'book':
+        return scrape_books(args)
+    if args.command == 'refresh':
+        return refresh(args)
+    if args.command == 'coordinator':
+        return coordinator(args)
+    if args.command == 'worker':
+        return worker(args)
+    if args.command == 'merge':
+        results = merge_outputs(args)
+        print(f'🧩 {sum(results.values())} books merged into {len(results)} categories')
+        return None
+    return crawl(args)
+
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
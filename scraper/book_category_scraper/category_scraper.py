@@ -1,42 +1,86 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import re
 import requests
-from bs4 import BeautifulSoup as bs
+from bs4 import BeautifulSoup as bs, SoupStrainer
 import sys
 import os
-# --- source : https://stackoverflow.com/questions/21005822/what-does-os-path-abspathos-path-joinos-path-dirname-file-os-path-pardir --- #
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from scraper.book_details_scraper.single_book_scraper import scrape_book_data
+if not __package__:
+    # --- source : https://stackoverflow.com/questions/21005822/what-does-os-path-abspathos-path-joinos-path-dirname-file-os-path-pardir --- #
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from scraper.book_details_scraper.single_book_scraper import configure_logging, scrape_book_data
 
+# Only the book anchors and the pagination of a listing page are parsed
+LISTING_REGIONS = SoupStrainer(['article', 'li'], class_=['product_pod', 'current', 'next'])
 
-def get_book_urls_from_page(category_url, book_urls=[]):
-    print(f'Starting to scrape category page: {category_url}')
-    response = requests.get(category_url)
-    soup = bs(response.content, 'html.parser')
 
+def read_category_page(page_url):
+    print(f'Starting to scrape category page: {page_url}')
+    response = requests.get(page_url)
+    soup = bs(response.content, 'html.parser', parse_only=LISTING_REGIONS)
+
+    book_urls = []
     books = soup.select('.product_pod h3 a')
     for book in books:
         book_url = 'http://books.toscrape.com/catalogue/' + book['href'].split('../')[-1]
         book_urls.append(book_url)
+    return soup, book_urls
+
+
+def iter_book_urls(category_url, max_workers=8):
+    """Yields the book URLs of a category, page by page, as soon as each listing page arrives.
+
+    The number of pages is read from "Page 1 of N" on the first page, and pages 2 to N are then
+    downloaded concurrently (yielded in page order). Without that indication, the 'next' links are
+    followed one page at a time, in a loop rather than by recursion.
+
+    Args:
+        category_url (str): URL of the first page of the category.
+        max_workers (int): Maximum number of listing pages downloaded at the same time.
+    """
+    soup, book_urls = read_category_page(category_url)
+    yield from book_urls
+
+    current_page = soup.find('li', class_='current')
+    match = re.search(r'Page\s+\d+\s+of\s+(\d+)', current_page.text) if current_page else None
+    if match and int(match[1]) > 1:
+        page_urls = [category_url.rsplit('/', 1)[0] + f'/page-{number}.html' for number in range(2, int(match[1]) + 1)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(page_urls))) as executor:
+            for _, book_urls in executor.map(read_category_page, page_urls):
+                yield from book_urls
+        return
 
     # Check if next page exists
     next_button = soup.find('li', class_='next')
-    if next_button:
-        next_page_url = next_button.find('a')['href']
-        next_page_full_url = category_url.rsplit('/', 1)[0] + '/' + next_page_url
-        return get_book_urls_from_page(next_page_full_url, book_urls)
-    else:
-        return book_urls
+    page_url = category_url
+    while next_button:
+        page_url = page_url.rsplit('/', 1)[0] + '/' + next_button.find('a')['href']
+        soup, book_urls = read_category_page(page_url)
+        yield from book_urls
+        next_button = soup.find('li', class_='next')
+
+
+def get_book_urls_from_page(category_url, book_urls=None):
+    if book_urls is None:
+        book_urls = []
+    book_urls.extend(iter_book_urls(category_url))
+    return book_urls
 
 if __name__ == '__main__':
+    import pandas as pd
+    from scraper.fingerprints import FingerprintTable
+
+    configure_logging()
     category_url = 'https://books.toscrape.com/catalogue/category/books/mystery_3/index.html'
     book_urls = get_book_urls_from_page(category_url)
     print(f'Book URLs for {category_url.split("/")[-2]}: {book_urls}')
     print(f'Total books found in the category: {len(book_urls)}')
     
     books_data = []
+    fingerprints = FingerprintTable()
     for url in book_urls:
-        book_data = scrape_book_data(url)
+        book_data = scrape_book_data(url, fingerprints)
         books_data.append(book_data)
+    fingerprints.close()
     
     
     df = pd.DataFrame(books_data)
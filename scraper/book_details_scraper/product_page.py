@@ -0,0 +1,291 @@
+from dataclasses import dataclass, field
+import importlib.util
+import sys
+
+
+# bs4 tree builders in order of preference; 'html.parser' ships with Python and is always available
+BS4_PARSERS = ('lxml', 'html.parser')
+PARSERS = ('selectolax',) + BS4_PARSERS
+
+# Regions of a product page read by _extract_from_soup (SoupStrainer arguments): the rest of the page
+# (head, navigation, scripts, footer) is never turned into a tree
+PRODUCT_REGIONS = {'name': ['ul', 'article'], 'class_': ['breadcrumb', 'product_page']}
+
+RATINGS = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+
+# Columns of a normalised book, in the order of the CSV files
+BOOK_COLUMNS = ('title', 'category', 'product_description', 'review_rating', 'image_url', 'price_including_tax',
+                'price_excluding_tax', 'number_available', 'universal_product_code', 'image_path')
+
+
+def available_parsers():
+    """Lists the parser backends that can be used in the current environment.
+
+    Returns:
+        list: Names of the installed parser backends, fastest first.
+    """
+    return [parser for parser in PARSERS if parser == 'html.parser' or importlib.util.find_spec(parser) is not None]
+
+
+def default_bs4_parser():
+    """Returns the fastest installed BeautifulSoup tree builder ('lxml' if installed, else 'html.parser')."""
+    return next(parser for parser in available_parsers() if parser in BS4_PARSERS)
+
+
+@dataclass
+class ProductPage:
+    """Raw (not yet normalised) fields extracted from a book product page.
+
+    The fallback values match the ones returned by the BookScraper extraction properties,
+    so that both paths produce the same rows.
+    """
+    title: str = 'No title found'
+    category: str = 'No category found'
+    product_description: str = 'No description found'
+    review_rating: str = 'No review rating found'
+    image_url: str = 'No image found'
+    table: dict = field(default_factory=dict)
+
+
+def _has_class(tag, class_name):
+    return class_name in tag.get('class', ())
+
+
+def _extract_from_soup(soup, base_url):
+    """Walks the document once and collects every region needed for a ProductPage.
+
+    The regions appear in document order (breadcrumb, gallery, product_main, description, table),
+    so the walk stops as soon as the details table has been read.
+    """
+    page = ProductPage()
+    breadcrumb = product_main = gallery = description_header = None
+    for tag in soup.descendants:
+        if tag.name is None:
+            continue
+        if tag.name == 'ul' and breadcrumb is None and _has_class(tag, 'breadcrumb'):
+            breadcrumb = tag
+        elif tag.name == 'div':
+            if gallery is None and tag.get('class') == ['item', 'active']:
+                gallery = tag
+            elif product_main is None and _has_class(tag, 'product_main'):
+                product_main = tag
+            elif description_header is None and tag.get('id') == 'product_description':
+                description_header = tag
+        elif tag.name == 'table' and tag.get('class') == ['table', 'table-striped']:
+            for row in tag.find_all('tr'):
+                page.table[row.find('th').text] = row.find('td').text
+            break
+
+    if breadcrumb:
+        page.category = breadcrumb.find_all('a')[2].text
+    if description_header:
+        description = description_header.find_next_sibling('p')
+        if description:
+            page.product_description = description.text
+    if product_main:
+        page.title = product_main.h1.text
+        page.review_rating = product_main.find('p', class_='star-rating')['class'][1]
+    if gallery and gallery.img:
+        page.image_url = base_url + gallery.img.get('src').split('../')[-1]
+    return page
+
+
+def _extract_with_selectolax(content, base_url):
+    """Same extraction as _extract_from_soup, using selectolax's CSS engine (C, no Python tree walk)."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(content)
+    page = ProductPage()
+
+    breadcrumb = tree.css_first('ul.breadcrumb')
+    if breadcrumb:
+        page.category = breadcrumb.css('a')[2].text()
+    product_main = tree.css_first('div.product_main')
+    if product_main:
+        page.title = product_main.css_first('h1').text()
+        page.review_rating = product_main.css_first('p.star-rating').attributes['class'].split()[1]
+    description = tree.css_first('div#product_description + p')
+    if description:
+        page.product_description = description.text()
+    gallery_image = tree.css_first('div[class="item active"] img')
+    if gallery_image:
+        page.image_url = base_url + gallery_image.attributes.get('src').split('../')[-1]
+    for row in tree.css('table[class="table table-striped"] tr'):
+        page.table[row.css_first('th').text()] = row.css_first('td').text()
+    return page
+
+
+def parse_product_page(content, base_url='https://books.toscrape.com/', parser=None):
+    """Extracts every field of a book product page in a single pass.
+
+    With BeautifulSoup, only the PRODUCT_REGIONS of the page are parsed, and the tree is released as
+    soon as the fields are read.
+
+    Args:
+        content (bytes): Raw HTML of the product page.
+        base_url (str): Base URL used to rebuild the absolute image URL.
+        parser (str): One of PARSERS. Defaults to the fastest installed BeautifulSoup tree builder.
+
+    Returns:
+        ProductPage: The raw fields of the book.
+    """
+    parser = parser or default_bs4_parser()
+    if parser == 'selectolax':
+        return _extract_with_selectolax(content, base_url)
+    # Imported on first use, so that the record helpers of this module do not load BeautifulSoup
+    from bs4 import BeautifulSoup as bs, SoupStrainer
+
+    soup = bs(content, parser, parse_only=SoupStrainer(**PRODUCT_REGIONS))
+    try:
+        return _extract_from_soup(soup, base_url)
+    finally:
+        # The tree is full of parent/child reference cycles: break them now rather than waiting for the garbage collector
+        soup.decompose()
+
+
+def book_fields(page):
+    """Returns the raw fields of a ProductPage, keyed like the columns of the CSV files.
+
+    Raises:
+        KeyError: If a row of the product information table is missing.
+    """
+    return {
+        'title': page.title,
+        'category': page.category,
+        'product_description': page.product_description,
+        'review_rating': page.review_rating,
+        'image_url': page.image_url,
+        'price_including_tax': page.table['Price (incl. tax)'],
+        'price_excluding_tax': page.table['Price (excl. tax)'],
+        'number_available': page.table['Availability'],
+        'universal_product_code (upc)': page.table['UPC'],
+    }
+
+
+def parse_price(text):
+    """Converts a price such as '£51.77' to a float."""
+    return float(text.replace('£', ''))
+
+
+def parse_availability(text):
+    """Converts an availability such as 'In stock (22 available)' to the number of books in stock."""
+    return int(text.replace('In stock (', '').replace(' available)', ''))
+
+
+class BookRecord:
+    """A normalised book, from its product page to its CSV row.
+
+    A class with __slots__ rather than a dict: a record takes about half the memory of the
+    equivalent dict, which matters when many books or snapshots are held at once. The category is
+    interned, so all the records of a category share a single string. Records pickle as a plain
+    tuple of values, which keeps the results of the parse processes small.
+
+    `image_path` is set once the category of the book is known.
+    """
+
+    __slots__ = BOOK_COLUMNS
+
+    def __init__(self, title, category, product_description, review_rating, image_url, price_including_tax,
+                 price_excluding_tax, number_available, universal_product_code, image_path=None):
+        self.title = title
+        self.category = sys.intern(category)
+        self.product_description = product_description
+        self.review_rating = review_rating
+        self.image_url = image_url
+        self.price_including_tax = price_including_tax
+        self.price_excluding_tax = price_excluding_tax
+        self.number_available = number_available
+        self.universal_product_code = universal_product_code
+        self.image_path = image_path
+
+    @classmethod
+    def from_fields(cls, fields):
+        """Builds a record from the raw fields returned by book_fields.
+
+        This is the only place where the raw values are converted: the rating becomes an integer,
+        prices floats without the '£' sign, and the availability the number of books in stock.
+
+        Raises:
+            ValueError: If a price or the availability cannot be converted.
+        """
+        return cls(
+            title=fields['title'],
+            category=fields['category'],
+            product_description=fields['product_description'],
+            review_rating=RATINGS.get(fields['review_rating'], 'No rating found'),
+            image_url=fields['image_url'],
+            price_including_tax=parse_price(fields['price_including_tax']),
+            price_excluding_tax=parse_price(fields['price_excluding_tax']),
+            number_available=parse_availability(fields['number_available']),
+            universal_product_code=fields['universal_product_code (upc)'],
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a record from the dict returned by to_dict (as stored by the index and the frontier)."""
+        return cls(**data)
+
+    def to_dict(self):
+        """Returns the record as a dict keyed by BOOK_COLUMNS, in column order."""
+        return {name: getattr(self, name) for name in BOOK_COLUMNS}
+
+    def __reduce__(self):
+        return BookRecord, tuple(getattr(self, name) for name in BOOK_COLUMNS)
+
+    def __eq__(self, other):
+        if not isinstance(other, BookRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in BOOK_COLUMNS)
+
+    def __repr__(self):
+        return f'BookRecord(universal_product_code={self.universal_product_code!r}, title={self.title!r})'
+
+
+def normalize_book_data(data):
+    """Converts the raw fields returned by book_fields to their final types, in place.
+
+    Same conversions as BookRecord.from_fields, for callers working on dicts; the key
+    'universal_product_code (upc)' is renamed 'universal_product_code'.
+    """
+    record = BookRecord.from_fields(data)
+    del data['universal_product_code (upc)']
+    data.update((name, getattr(record, name)) for name in BOOK_COLUMNS if name != 'image_path')
+
+
+def normalize_frame(books):
+    """Normalises many books at once, one column at a time, for analyses over large catalogues or many snapshots.
+
+    Each conversion runs once per column with pandas' vectorized string and numeric operations
+    instead of once per book. The category becomes a categorical column, which stores each
+    category name once. Unlike BookRecord.from_fields, an unknown rating becomes a missing value
+    (<NA>), so that the rating column stays numeric.
+
+    Columns (a DataFrame, or a dict of lists, as read from a CSV or Parquet snapshot) are the fast
+    path; rows are first transposed into columns, which costs about as much as converting them one
+    by one.
+
+    Args:
+        books: Raw fields as a pandas.DataFrame, a dict of columns, or an iterable of dicts as returned by book_fields.
+
+    Raises:
+        ValueError: If a price or an availability cannot be converted.
+
+    Returns:
+        pandas.DataFrame: One row per book, with the columns of BOOK_COLUMNS first and any other column
+        (a snapshot date, for example) unchanged after them.
+    """
+    # pandas is only needed here: importing it would slow down every parse process
+    import pandas as pd
+
+    frame = books.copy() if isinstance(books, pd.DataFrame) else pd.DataFrame(books if isinstance(books, dict) else list(books))
+    if frame.empty:
+        return frame
+    frame = frame.rename(columns={'universal_product_code (upc)': 'universal_product_code'})
+    for column in ('price_including_tax', 'price_excluding_tax'):
+        frame[column] = frame[column].str.replace('£', '', regex=False).astype('float64')
+    frame['number_available'] = (frame['number_available'].str.replace('In stock (', '', regex=False)
+                                 .str.replace(' available)', '', regex=False).astype('int64'))
+    frame['review_rating'] = frame['review_rating'].map(RATINGS).astype('Int64')
+    frame['category'] = frame['category'].astype('category')
+    return frame[[column for column in BOOK_COLUMNS if column in frame.columns]
+                 + [column for column in frame.columns if column not in BOOK_COLUMNS]]
@@ -1,28 +1,42 @@
-from bs4 import BeautifulSoup as bs
 import logging
 from requests.exceptions import RequestException
 import os
-import pandas as pd
 import requests
+import sys
+if not __package__:
+    # --- lancé comme script : même astuce que dans scraper/book_category_scraper pour importer depuis la racine du projet --- #
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from scraper.book_details_scraper.product_page import BookRecord, ProductPage, book_fields, parse_product_page
+from scraper.fingerprints import SINGLE_BOOK
 
-log_dir = os.path.join('scraper', 'logs')
-os.makedirs(log_dir, exist_ok=True)
+LOG_FILE = os.path.join('scraper', 'logs', 'books_scraper_logs.log')
 
-# configure the logging
-logging.basicConfig(filename=os.path.join(log_dir, 'books_scraper_logs.log'),
-                    level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
+logger = logging.getLogger(__name__)
 
 
-def scrape_book_data(url):
+def configure_logging(log_file=LOG_FILE):
+    """Writes the log messages to log_file, creating its directory if needed.
+
+    Called by the scripts when they are run directly; importing this module configures nothing.
+    """
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
+
+
+def scrape_book_data(url, fingerprints=None):
     """Scrapes book data from books.toscrape.com.
 
+    With a FingerprintTable, a page byte-identical to the last one parsed at the same URL is not
+    parsed again: the record extracted then is returned.
+
     Args:
         url (str): The URL of the book page to scrape
+        fingerprints (FingerprintTable): Fingerprints of the pages already parsed. Defaults to None (every page is parsed).
         
     Returns:
         dict: A dictionary containing the book data such as: title, category, product_description, review_rating, price (including tax), price (excluding tax), available stock, UPC, and image URL. Returns None if an error occurs during the scraping process.
     
-    Logs errors to 'books_scraper_logs.log' if the GET request or HTML parsing fails or if any of the required data is not found/missing on the page.
+    Logs errors (to 'books_scraper_logs.log' once configure_logging has been called) if the GET request or HTML parsing fails or if any of the required data is not found/missing on the page.
     """
     
     print(f'Starting to scrape book data from {url}')
@@ -32,85 +46,69 @@ def scrape_book_data(url):
         response = requests.get(url)
         response.raise_for_status()
     except RequestException as e:
-        logging.error(f'Error sending GET request: {e}')
+        logger.error(f'Error sending GET request: {e}')
         print(f'Failed to get response for {url}')
         return None
-    
+
+    fingerprint = None
+    if fingerprints is not None:
+        fingerprint = fingerprints.fingerprint(response.content)
+        record = fingerprints.reuse(SINGLE_BOOK, url, fingerprint)
+        if record is not None:
+            print(f'Unchanged page, reusing data for {record["title"]}')
+            return _book_data(url, BookRecord.from_dict(record))
+
     try:
-        # Parse the HTML content
-        soup = bs(response.content, 'html.parser')
+        # Parse the HTML content, with the same extraction and normalisation as book_scraper.py
+        page = parse_product_page(response.content, 'https://books.toscrape.com/', 'html.parser')
     except Exception as e:
-        logging.error(f'Error parsing the HTML content: {e}')
+        logger.error(f'Error parsing the HTML content: {e}')
         print(f'Failed to parse the HTML content for {url}')
         return None
-    
-    # Extract the book data
-    
-    title_element  = soup.find('div', class_='product_main').h1
-    if not title_element:
-        logging.error('No title found')
-        return None
-    title = title_element.text
-    
-    product_description_element = soup.find('div', id='product_description')
-    product_description = product_description_element.find_next_sibling('p').text if product_description_element else 'No description found'
-    
-    category_element = soup.find('ul', class_='breadcrumb').find_all('a')[2]
-    if not category_element:
-        logging.error('No category found')
-        return None
-    category = category_element.text
-    
-    review_rating_element = soup.find('p', class_='star-rating')
-    if not review_rating_element:
-        logging.error('No review rating found')
+
+    for name in ('title', 'category', 'review_rating'):
+        if getattr(page, name) == getattr(ProductPage, name):
+            logger.error(f'No {name.replace("_", " ")} found')
+            return None
+
+    try:
+        book = BookRecord.from_fields(book_fields(page))
+    except (KeyError, ValueError) as e:
+        logger.error(f'Missing or invalid book data: {e}')
         return None
-    review_rating = review_rating_element['class'][1]
-    
-    image_element = soup.find('div', class_='item active').img
-    image_url = image_element.get('src') if image_element else 'No image found'
-    image_url = 'https://books.toscrape.com/' + image_url.split('../')[-1]
-    
 
-    # Extract table data
-    table = soup.find('table', class_='table table-striped')
-    book_data = {}
-    for row in table.find_all('tr'):
-        # Extract the key and value from the row
-        key = row.find('th').text
-        value = row.find('td').text
-        book_data[key] = value
-
-    # Normalize data
-    review_rating_dict = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
-    review_rating = review_rating_dict.get(review_rating, 'No rating found')
-    
-    price_including_tax = float(book_data['Price (incl. tax)'].replace('£', ''))
-    price_excluding_tax = float(book_data['Price (excl. tax)'].replace('£', ''))
-    number_available = int(book_data['Availability'].replace('In stock (', '').replace(' available)', ''))
-    universal_product_code = book_data['UPC']
-    
-    print(f'Successfully scraped data for {title}')
-    
-    # Return the book data
+    if fingerprint is not None:
+        fingerprints.store(SINGLE_BOOK, url, fingerprint, book.to_dict())
+    print(f'Successfully scraped data for {book.title}')
+    return _book_data(url, book)
+
+
+def _book_data(url, book):
+    """Returns the book data of scrape_book_data, built from a BookRecord."""
     return {
         'product_page_url': url,
-        'universal_product_code (upc)': universal_product_code,
-        'title': title,
-        'price_including_tax': price_including_tax,
-        'price_excluding_tax': price_excluding_tax,
-        'number_available': number_available,
-        'category': category,
-        'product_description': product_description,
-        'review_rating': review_rating,
-        'image_url': image_url,
+        'universal_product_code (upc)': book.universal_product_code,
+        'title': book.title,
+        'price_including_tax': book.price_including_tax,
+        'price_excluding_tax': book.price_excluding_tax,
+        'number_available': book.number_available,
+        'category': book.category,
+        'product_description': book.product_description,
+        'review_rating': book.review_rating,
+        'image_url': book.image_url,
     }
 
 if __name__ == '__main__':
+    import pandas as pd
+    from scraper.fingerprints import FingerprintTable
+
+    configure_logging()
     product_url = 'https://books.toscrape.com/catalogue/ready-player-one_209/index.html'
 
     print('Starting the book scraping process...')
-    book_data = scrape_book_data(product_url)
+    fingerprints = FingerprintTable()
+    book_data = scrape_book_data(product_url, fingerprints)
+    fingerprints.close()
     
     if book_data:
         
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from urllib.parse import urlsplit, urlunsplit
+from scraper.book_details_scraper.product_page import BookRecord
+from scraper.http_cache import _atomic_write
+
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+
+def normalize_url(url):
+    """Returns url with repeated slashes in its path collapsed, used to match the different spellings of a URL.
+
+    Listing pages link to books as 'catalogue//slug/index.html' once made absolute, while urljoin
+    collapses the same URL to 'catalogue/slug/index.html'.
+    """
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=re.sub('/{2,}', '/', parts.path)))
+
+
+def content_hash(content):
+    """Returns a short hash of a page body, used to detect unchanged product pages."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class CrawlIndex:
+    """Local index of the books seen by previous runs, keyed by universal_product_code.
+
+    Each entry holds the product page URL, the hash of the page body and the last extracted
+    (normalised) record, so that an unchanged page can be reused without being parsed again and a
+    changed page is only reported as changed if its record differs. The index is a JSON file
+    written atomically.
+
+    Args:
+        path (str): Path of the index file. Created on the first flush if missing.
+        flush_every (int): Number of updates between two writes of the index.
+    """
+
+    def __init__(self, path='.crawl_index.json', flush_every=200):
+        self.path = path
+        self.flush_every = flush_every
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        self._lock = threading.Lock()
+        self._updates_since_flush = 0
+        self._entries = self._load()
+        self._upc_by_url = {normalize_url(entry['url']): upc for upc, entry in self._entries.items()}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, url):
+        """Returns the entry of the book last seen at url, or None.
+
+        Args:
+            url (str): Product page URL, in any spelling (see normalize_url).
+
+        Returns:
+            dict: Entry with the keys url, content_hash and record.
+        """
+        with self._lock:
+            upc = self._upc_by_url.get(normalize_url(url))
+            return self._entries.get(upc) if upc is not None else None
+
+    def known_url(self, url):
+        """Returns the URL under which the book at url was indexed (the same page, possibly spelled differently), or None."""
+        entry = self.lookup(url)
+        return entry['url'] if entry is not None else None
+
+    def url_of(self, upc):
+        """Returns the product page URL where the book with this UPC was last seen, or None."""
+        with self._lock:
+            entry = self._entries.get(upc)
+            return entry['url'] if entry is not None else None
+
+    def reuse(self, url, page_hash):
+        """Returns the last record of url if its page body has not changed, and counts it.
+
+        Args:
+            url (str): Product page URL.
+            page_hash (str): content_hash of the page body just downloaded.
+
+        Returns:
+            BookRecord: The previously extracted record, or None if the page is new or changed.
+        """
+        entry = self.lookup(url)
+        if entry is None or entry['content_hash'] != page_hash:
+            return None
+        with self._lock:
+            self.counts[UNCHANGED] += 1
+        return BookRecord.from_dict(entry['record'])
+
+    def update(self, url, page_hash, book_data):
+        """Records a freshly extracted book and returns how it compares with the previous run.
+
+        A page whose body changed but whose record did not (markup, tracking parameters...) is
+        UNCHANGED: only the values written to the output files count.
+
+        Args:
+            url (str): Product page URL.
+            page_hash (str): content_hash of the page body.
+            book_data (BookRecord): Normalised record of the book.
+
+        Returns:
+            str: NEW if the UPC was never seen, CHANGED if its record differs from the stored one, UNCHANGED otherwise.
+        """
+        upc = book_data.universal_product_code
+        record = book_data.to_dict()
+        with self._lock:
+            entry = self._entries.get(upc)
+            if entry is None:
+                change = NEW
+            else:
+                change = UNCHANGED if entry['record'] == record else CHANGED
+            self._entries[upc] = {'url': url, 'content_hash': page_hash, 'record': record}
+            self._upc_by_url[normalize_url(url)] = upc
+            self.counts[change] += 1
+            self._updates_since_flush += 1
+            flush = self._updates_since_flush >= self.flush_every
+        if flush:
+            self.flush()
+        return change
+
+    def flush(self):
+        """Writes the index to disk."""
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False).encode('utf-8')
+            self._updates_since_flush = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _atomic_write(self.path, data)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        """Returns a one-line summary of this run's changes, for the end-of-run report."""
+        return (f'Incremental index: {self.counts[NEW]} new, {self.counts[CHANGED]} changed, '
+                f'{self.counts[UNCHANGED]} unchanged, {len(self)} books indexed')
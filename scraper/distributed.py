@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import time
+from scraper.http_cache import _atomic_write
+from scraper.work_queue import DONE
+
+
+# Kinds of task: a category is listed into page tasks, a page task scrapes the books of one listing page
+CATEGORY = 'category'
+PAGE = 'page'
+
+
+# Written in the parts directory by the first merge of a finished queue, with its timestamp: merging again reuses the
+# timestamp and does not record the rows in the price history twice
+HISTORY_MARKER = '.history_recorded'
+
+
+def part_path(parts_dir, category_name, page):
+    """Returns the path of the partial output of a listing page: JSON Lines, one row per book."""
+    return os.path.join(parts_dir, category_name, f'{page:05d}.jsonl')
+
+
+def clear(queue, parts_dir):
+    """Removes every task of the queue and the partial outputs of the previous crawl."""
+    queue.reset()
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+def seed(queue, category_urls):
+    """Adds one task per category to the queue, in home page order.
+
+    Page tasks are leased before category tasks, so that workers finish the books of the categories
+    already listed before listing new ones.
+
+    Args:
+        queue (WorkQueue): Shared queue.
+        category_urls (dict): Category names and URLs.
+
+    Returns:
+        int: Number of categories added (those already in the queue are kept as they are).
+    """
+    return sum(queue.put(f'{CATEGORY}:{name}', CATEGORY, {'name': name, 'url': url}, priority=1) for name, url in category_urls.items())
+
+
+def _list_category(scraper, queue, task, lease):
+    """Reads the listing pages of a category and adds one page task per non-empty page."""
+    name = task.payload['name']
+    print(f'🎣 Listing category: {name}')
+    count = 0
+    for page, books_urls in enumerate(scraper.iter_category_pages(task.payload['url'])):
+        if books_urls is None:
+            # The task is retried as a whole; the page tasks already added are not duplicated
+            raise RuntimeError(f'listing page {page + 1} of {name} could not be retrieved')
+        if books_urls:
+            queue.put(f'{PAGE}:{name}:{page:05d}', PAGE, {'category': name, 'page': page, 'urls': books_urls})
+            count += len(books_urls)
+        lease()
+    print(f'📚 Number of books found for {name}: {count}')
+
+
+def _scrape_page(scraper, task, lease, parts_dir):
+    """Scrapes the books of a page task and writes their rows to its partial output, atomically."""
+    category_name, page, urls = task.payload['category'], task.payload['page'], task.payload['urls']
+    rows = []
+    for book_data, change in scraper.iter_scraped_books(urls, category_name):
+        row = scraper.row_to_save(book_data, change)
+        if row is not None:
+            rows.append(json.dumps(row, ensure_ascii=False))
+        lease()
+    scraper.retry_failed_images()
+    path = part_path(parts_dir, category_name, page)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A task taken over after a lease expiry rewrites the same file: the merge never sees a row twice
+    _atomic_write(path, ''.join(row + '\n' for row in rows).encode('utf-8'))
+
+
+def run_worker(scraper, queue, worker, parts_dir, visibility_timeout=60.0, poll_interval=0.5):
+    """Leases and processes tasks until the queue has no pending or leased task left.
+
+    While other workers still hold leases, the worker polls the queue, so that it takes over the
+    tasks of a worker that dies (once their visibility timeout expires).
+
+    Args:
+        scraper (BookScraper): Scraper used for the listing pages and the books.
+        queue (WorkQueue): Shared queue.
+        worker (str): Identifier of the worker, recorded on its leases.
+        parts_dir (str): Directory of the partial outputs.
+        visibility_timeout (float): Duration of a lease, extended after each listing page or book.
+        poll_interval (float): Seconds between two polls when no task is available.
+
+    Returns:
+        int: Number of tasks processed by this worker.
+    """
+    processed = 0
+    while True:
+        task = queue.lease(worker, visibility_timeout)
+        if task is None:
+            if not queue.unfinished():
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        def lease():
+            if not queue.extend(task, worker, visibility_timeout):
+                print(f'❗ Lease of {task.key} lost by {worker}, another worker took it over')
+
+        try:
+            if task.kind == CATEGORY:
+                _list_category(scraper, queue, task, lease)
+            else:
+                _scrape_page(scraper, task, lease, parts_dir)
+        except Exception as e:
+            status = queue.fail(task, worker, repr(e))
+            print(f'❌ Task {task.key} failed on {worker} (attempt {task.attempts}, now {status}): {e!r}')
+        else:
+            queue.complete(task, worker)
+        processed += 1
+
+
+def merge(scraper, queue, parts_dir, record_history=True):
+    """Combines the partial outputs into one output file per category, as scrape_and_save_books writes it.
+
+    Categories are written in home page order and rows in listing order. Categories whose listing
+    failed and pages whose task failed are reported and left out.
+
+    Args:
+        scraper (BookScraper): Scraper providing the output files (open_sink, write_row, close_sink) and the price history.
+        queue (WorkQueue): Queue of a finished crawl.
+        parts_dir (str): Directory of the partial outputs.
+        record_history (bool): Adds the rows to the price history; False when the same parts were already recorded.
+
+    Returns:
+        dict: Number of books written for each category.
+    """
+    pages = {}
+    for task in queue.tasks(PAGE):
+        pages.setdefault(task.payload['category'], []).append(task)
+
+    results = {}
+    for category in queue.tasks(CATEGORY):
+        name = category.payload['name']
+        if category.status != DONE:
+            print(f'❌ Listing of {name} failed: {category.error}')
+            continue
+        category_pages = sorted(pages.get(name, ()), key=lambda task: task.payload['page'])
+        if not category_pages:
+            print(f'❗ No books found for {name}. Skipping...')
+            continue
+        sink = scraper.open_sink(name)
+        count = 0
+        try:
+            for page in category_pages:
+                if page.status != DONE:
+                    print(f"❌ Books of {name}, page {page.payload['page'] + 1}, failed: {page.error}")
+                    continue
+                with open(part_path(parts_dir, name, page.payload['page']), encoding='utf-8') as part_file:
+                    for line in part_file:
+                        row = json.loads(line)
+                        if record_history:
+                            scraper.record_history(row)
+                        scraper.write_row(sink, row)
+                        count += 1
+        except BaseException:
+            sink.abort()
+            raise
+        scraper.close_sink(sink, name)
+        results[name] = count
+    return results
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import threading
+from scraper.crawl_index import content_hash
+
+
+# Kinds of page, each with its own extraction and payload
+PRODUCT = 'product'
+LISTING = 'listing'
+CATEGORIES = 'categories'
+# Product pages read by scrape_book_data, whose image URLs are always built from books.toscrape.com
+SINGLE_BOOK = 'single_book'
+
+# Bumped whenever an extraction changes, so that payloads extracted by older code are not reused
+EXTRACTION_VERSION = 1
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, url)
+) WITHOUT ROWID;
+'''
+
+
+class FingerprintTable:
+    """Persistent per-URL table of page fingerprints and of the data last extracted from each page.
+
+    When a page body is byte-identical to the one seen last time (same content_hash), its previous
+    payload is returned and the page is not parsed at all. Unlike conditional requests, this works
+    even when the server ignores If-None-Match / If-Modified-Since, so parsing CPU scales with the
+    number of changed pages.
+
+    Payloads are JSON values (a BookRecord dict for product pages, the book URLs and pagination of a
+    listing page...). The table is loaded into memory when opened; new fingerprints are buffered
+    and committed in one transaction every `batch_size` pages and on flush().
+
+    Args:
+        path (str): Path of the SQLite database. Created if missing.
+        batch_size (int): Number of pages per transaction.
+    """
+
+    def __init__(self, path='.page_fingerprints.sqlite', batch_size=200):
+        self.path = path
+        self.batch_size = batch_size
+        self.reused = 0
+        self.parsed = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        # The workers of a distributed crawl share the table: wait for each other's commits as long as on the work queue
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] != EXTRACTION_VERSION:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.execute(f'PRAGMA user_version = {EXTRACTION_VERSION}')
+            self._conn.commit()
+        self._pages = {(kind, url): (fingerprint, payload) for kind, url, fingerprint, payload in self._conn.execute('SELECT * FROM pages')}
+
+    @staticmethod
+    def fingerprint(content):
+        """Returns the fingerprint of a page body (content_hash, a 128-bit BLAKE2b digest)."""
+        return content_hash(content)
+
+    def reuse(self, kind, url, fingerprint):
+        """Returns the payload last extracted from url if its body has the same fingerprint, and counts it.
+
+        Args:
+            kind (str): PRODUCT, LISTING, CATEGORIES or SINGLE_BOOK.
+            url (str): URL of the page.
+            fingerprint (str): Fingerprint of the body just downloaded.
+
+        Returns:
+            The decoded payload, or None if the page is new or changed (it must then be parsed).
+        """
+        with self._lock:
+            entry = self._pages.get((kind, url))
+            if entry is None or entry[0] != fingerprint:
+                self.parsed += 1
+                return None
+            self.reused += 1
+        return json.loads(entry[1])
+
+    def store(self, kind, url, fingerprint, payload):
+        """Records the payload extracted from a page body with the given fingerprint.
+
+        Args:
+            kind (str): PRODUCT, LISTING, CATEGORIES or SINGLE_BOOK.
+            url (str): URL of the page.
+            fingerprint (str): Fingerprint of the parsed body.
+            payload: JSON-serialisable data extracted from the page.
+        """
+        row = (kind, url, fingerprint, json.dumps(payload, ensure_ascii=False))
+        with self._lock:
+            self._pages[kind, url] = row[2:]
+            self._pending.append(row)
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commits the buffered fingerprints in a single transaction."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                self._conn.executemany('INSERT OR REPLACE INTO pages (kind, url, fingerprint, payload) VALUES (?, ?, ?, ?)', rows)
+                self._conn.commit()
+
+    def close(self):
+        """Commits the buffered fingerprints and closes the database."""
+        self.flush()
+        self._conn.close()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report."""
+        return f'Fingerprints: {self.reused} unchanged pages not parsed, {self.parsed} parsed, {len(self)} pages known'
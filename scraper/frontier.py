@@ -0,0 +1,194 @@
+import json
+import sqlite3
+import threading
+import time
+from scraper.book_details_scraper.product_page import BookRecord
+
+
+PENDING = 'pending'
+LISTED = 'listed'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE TABLE IF NOT EXISTS books (
+    url TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    change TEXT,
+    record TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS books_by_category ON books (category, position);
+'''
+
+
+class Frontier:
+    """Persistent crawl frontier stored in SQLite, used to resume an interrupted crawl.
+
+    It records the categories found on the home page, the book URLs found on each category's
+    listing pages, and the status of every book. Finished books keep their extracted record, so
+    that a resumed run can rebuild a category's output without fetching them again.
+
+    Book status updates are buffered and committed in one transaction every `batch_size`
+    updates or `flush_interval` seconds; a crash therefore re-fetches at most one batch.
+
+    Args:
+        path (str): Path of the SQLite database.
+        resume (bool): Keep the state of the previous run. If False, the frontier is emptied.
+        batch_size (int): Number of book updates per transaction.
+        flush_interval (float): Maximum number of seconds between two commits.
+    """
+
+    def __init__(self, path='.crawl_frontier.sqlite', resume=False, batch_size=200, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.resumed = 0
+        self._lock = threading.Lock()
+        self._pending_updates = []
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        if not resume:
+            self._conn.execute('DELETE FROM books')
+            self._conn.execute('DELETE FROM categories')
+            self._conn.commit()
+        # Finished books of the previous run, looked up once per book URL
+        self._done = {
+            url: (BookRecord.from_dict(json.loads(record)), change)
+            for url, record, change in self._conn.execute('SELECT url, record, change FROM books WHERE status = ?', (DONE,))
+        }
+
+    def categories(self):
+        """Returns the categories recorded by a previous run, in home page order.
+
+        Returns:
+            dict: Category names and URLs (empty if none was recorded).
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT name, url FROM categories ORDER BY position').fetchall()
+        return dict(rows)
+
+    def add_categories(self, category_urls):
+        """Records the categories found on the home page.
+
+        Args:
+            category_urls (dict): Category names and URLs.
+        """
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO categories (name, url, position) VALUES (?, ?, ?)',
+                [(name, url, position) for position, (name, url) in enumerate(category_urls.items())],
+            )
+            self._conn.commit()
+
+    def category_status(self, category_name):
+        """Returns PENDING, LISTED or DONE for a recorded category (None if unknown)."""
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM categories WHERE name = ?', (category_name,)).fetchone()
+        return row[0] if row else None
+
+    def category_books(self, category_name):
+        """Returns the book URLs of a category already listed, in listing order.
+
+        Args:
+            category_name (str): Category name.
+
+        Returns:
+            list: Book URLs, or None if the category's listing pages were not fully read.
+        """
+        if self.category_status(category_name) not in (LISTED, DONE):
+            return None
+        with self._lock:
+            rows = self._conn.execute('SELECT url FROM books WHERE category = ? ORDER BY position', (category_name,)).fetchall()
+        return [url for url, in rows]
+
+    def add_category_books(self, category_name, books_urls, start=0, complete=True):
+        """Records book URLs of a category, for instance those of one listing page.
+
+        Args:
+            category_name (str): Category name.
+            books_urls (list): Book URLs in listing order.
+            start (int): Position of the first URL in the category.
+            complete (bool): True if these are the last URLs of the category, which is then marked as listed.
+        """
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO books (url, category, position) VALUES (?, ?, ?)',
+                [(url, category_name, position) for position, url in enumerate(books_urls, start)],
+            )
+            if complete:
+                self._conn.execute('UPDATE categories SET status = ? WHERE name = ?', (LISTED, category_name))
+            self._conn.commit()
+
+    def mark_category_listed(self, category_name):
+        """Records that every listing page of a category has been read."""
+        with self._lock:
+            self._conn.execute('UPDATE categories SET status = ? WHERE name = ?', (LISTED, category_name))
+            self._conn.commit()
+
+    def completed(self, url):
+        """Returns the result recorded for a book finished by a previous run.
+
+        Args:
+            url (str): Book URL.
+
+        Returns:
+            tuple: (record, change) as returned by BookScraper._scrape_book, or None if the book must be scraped.
+        """
+        result = self._done.get(url)
+        if result is not None:
+            with self._lock:
+                self.resumed += 1
+        return result
+
+    def mark_book(self, url, book_data, change):
+        """Records the result of a book; buffered until the next batch commit.
+
+        Args:
+            url (str): Book URL.
+            book_data (BookRecord): Extracted record, or None if the book failed (it will be retried on resume).
+            change (str): Change type reported by the incremental index, if any.
+        """
+        status = DONE if book_data is not None else FAILED
+        record = json.dumps(book_data.to_dict(), ensure_ascii=False) if book_data is not None else None
+        with self._lock:
+            self._pending_updates.append((status, change, record, time.time(), url))
+            due = len(self._pending_updates) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def mark_category_done(self, category_name):
+        """Records that the output of a category has been finalized."""
+        self.flush()
+        with self._lock:
+            self._conn.execute('UPDATE categories SET status = ? WHERE name = ?', (DONE, category_name))
+            self._conn.commit()
+
+    def flush(self):
+        """Commits the buffered book updates in a single transaction."""
+        with self._lock:
+            updates, self._pending_updates = self._pending_updates, []
+            self._last_flush = time.monotonic()
+            if updates:
+                self._conn.executemany('UPDATE books SET status = ?, change = ?, record = ?, updated_at = ? WHERE url = ?', updates)
+                self._conn.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report."""
+        return f'Frontier: {self.resumed} books resumed from the previous run'
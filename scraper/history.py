@@ -0,0 +1,358 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+# Columns of a snapshot, as found in the output files of book_scraper.py
+SNAPSHOT_COLUMNS = ('universal_product_code', 'scraped_at', 'category', 'title', 'price_including_tax',
+                    'price_excluding_tax', 'number_available', 'review_rating')
+
+# Length of the scraped_at prefix that identifies a period (scraped_at is 'YYYY-MM-DDTHH:MM:SS')
+PERIODS = {'snapshot': 19, 'day': 10, 'month': 7, 'year': 4}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    universal_product_code TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    category TEXT NOT NULL,
+    title TEXT,
+    price_including_tax REAL,
+    price_excluding_tax REAL,
+    number_available INTEGER,
+    review_rating INTEGER,
+    PRIMARY KEY (universal_product_code, scraped_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_by_category
+    ON snapshots (category, scraped_at, price_including_tax, number_available);
+CREATE INDEX IF NOT EXISTS snapshots_by_time ON snapshots (scraped_at);
+CREATE TABLE IF NOT EXISTS category_snapshots (
+    category TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    books INTEGER NOT NULL,
+    price_sum REAL,
+    min_price REAL,
+    max_price REAL,
+    stock INTEGER,
+    PRIMARY KEY (category, scraped_at)
+) WITHOUT ROWID;
+'''
+
+# Timestamp in the output file names: <category>_books_data_YYYYMMDD_HHMMSS.<extension>
+_FILE_TIMESTAMP = re.compile(r'_(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})\.\w+$')
+
+
+class PriceHistory:
+    """Price and stock history of every book, appended by each run and queried without rereading the output files.
+
+    Snapshots are stored in SQLite, clustered by (universal_product_code, scraped_at), so that the
+    history of a book is a single range read. Once every book of a category is recorded,
+    complete() writes one summary row for the category and snapshot (number of books, price sum,
+    minimum and maximum, stock), so the per-category trends read a few rows per snapshot instead
+    of every book.
+
+    Rows are buffered and committed in one transaction every `batch_size` rows and on flush().
+
+    Summary rows are only written for complete categories, since a partial count would skew the
+    category trends: the categories of an interrupted run are never completed, and a run that only
+    scrapes some books of each category (a targeted refresh) is recorded with rollup=False. Their
+    snapshots are still kept for the book histories and price changes.
+
+    Args:
+        path (str): Path of the SQLite database. Created if missing.
+        scraped_at (str): Timestamp of the snapshots added by add(), 'YYYY-MM-DDTHH:MM:SS'. Defaults to now.
+        batch_size (int): Number of rows per transaction.
+        rollup (bool): Refreshes the per-category summary rows of the snapshots added.
+    """
+
+    def __init__(self, path='.price_history.sqlite', scraped_at=None, batch_size=500, rollup=True):
+        self.path = path
+        self.scraped_at = scraped_at or time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.batch_size = batch_size
+        self.rollup = rollup
+        self.added = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        # (category, scraped_at) of the snapshots committed without their summary row yet
+        self._incomplete = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, book_data, scraped_at=None):
+        """Records the snapshot of a book.
+
+        Args:
+            book_data (BookRecord or dict): Normalised record of the book.
+            scraped_at (str): Timestamp of the snapshot. Defaults to the timestamp of this run.
+        """
+        if not isinstance(book_data, dict):
+            book_data = book_data.to_dict()
+        rating = book_data['review_rating']
+        row = (book_data['universal_product_code'], scraped_at or self.scraped_at, book_data['category'], book_data['title'],
+               book_data['price_including_tax'], book_data['price_excluding_tax'], book_data['number_available'],
+               rating if isinstance(rating, int) else None)
+        with self._lock:
+            self._pending.append(row)
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commits the buffered snapshots in a single transaction."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                placeholders = ', '.join('?' * len(SNAPSHOT_COLUMNS))
+                self._conn.executemany(f'INSERT OR REPLACE INTO snapshots ({", ".join(SNAPSHOT_COLUMNS)}) VALUES ({placeholders})', rows)
+                self._conn.commit()
+                self.added += len(rows)
+                self._incomplete.update((category, scraped_at) for _, scraped_at, category, *_ in rows)
+
+    def complete(self, category=None, rollup=True):
+        """Commits the buffered snapshots and writes the summary rows of a category whose books are all recorded.
+
+        Args:
+            category (str): Category completed, or None for every category recorded since the last call.
+            rollup (bool): False for partial snapshots (a file written with --delta): no summary row is written.
+        """
+        self.flush()
+        with self._lock:
+            keys = {key for key in self._incomplete if category is None or key[0] == category}
+            self._incomplete -= keys
+            if keys and self.rollup and rollup:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO category_snapshots '
+                    'SELECT category, scraped_at, COUNT(*), SUM(price_including_tax), MIN(price_including_tax), '
+                    'MAX(price_including_tax), SUM(number_available) '
+                    'FROM snapshots WHERE category = ? AND scraped_at = ? GROUP BY category, scraped_at',
+                    keys,
+                )
+                self._conn.commit()
+
+    def import_file(self, path, rollup=True):
+        """Adds the rows of an output file of book_scraper.py (CSV, JSON Lines or Parquet) to the history.
+
+        The snapshot timestamp is read from the file name, which is also the timestamp of the
+        snapshots recorded by the run that wrote it: importing the files of a recorded run replaces
+        its snapshots instead of adding new ones. In files written with --delta, only the new and
+        changed books are present, and only they are added, without summary rows.
+
+        Args:
+            path (str): Path of the file.
+            rollup (bool): Writes the per-category summary rows; False for the file of a targeted refresh.
+
+        Returns:
+            int: Number of rows added, or 0 if the file name has no timestamp.
+        """
+        match = _FILE_TIMESTAMP.search(path)
+        if match is None:
+            return 0
+        scraped_at = '{}-{}-{}T{}:{}:{}'.format(*match.groups())
+        count = 0
+        for row in _read_rows(path):
+            # The 'change' column is only written with --delta
+            rollup = rollup and 'change' not in row
+            book_data = {
+                'universal_product_code': row['universal_product_code'],
+                'category': row['category'],
+                'title': row['title'],
+                'price_including_tax': float(row['price_including_tax']),
+                'price_excluding_tax': float(row['price_excluding_tax']),
+                'number_available': int(row['number_available']),
+                'review_rating': int(row['review_rating']) if str(row['review_rating']).isdigit() else None,
+            }
+            self.add(book_data, scraped_at)
+            count += 1
+        self.complete(rollup=rollup)
+        return count
+
+    def import_directory(self, directory='datas'):
+        """Imports every output file found under directory (datas/<category>/...) and returns the number of rows added.
+
+        The files of targeted refreshes (datas/refresh/...) only hold some books of each category: their
+        snapshots are imported without the per-category summary rows.
+        """
+        paths = sorted(glob.glob(os.path.join(directory, '*', '*_books_data_*.*')))
+        return sum(self.import_file(path, rollup=os.path.basename(os.path.dirname(path)) != 'refresh')
+                   for path in paths if not path.endswith('.part'))
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, parameters)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def book_history(self, upc, since=None, until=None):
+        """Returns the snapshots of a book, oldest first.
+
+        Args:
+            upc (str): universal_product_code of the book.
+            since (str): Earliest timestamp (or prefix, such as '2024-05'), included.
+            until (str): Latest timestamp (or prefix), included.
+
+        Returns:
+            list: Dicts with the keys scraped_at, title, category, price_including_tax,
+            price_excluding_tax, number_available and review_rating.
+        """
+        where, parameters = _time_range(since, until)
+        return self._query(
+            'SELECT scraped_at, title, category, price_including_tax, price_excluding_tax, number_available, review_rating '
+            f'FROM snapshots WHERE universal_product_code = ?{where} ORDER BY scraped_at',
+            (upc, *parameters),
+        )
+
+    def category_trend(self, category=None, period='day', since=None, until=None):
+        """Returns price and stock aggregates per category and period, oldest first.
+
+        Args:
+            category (str): Category name, or None for every category.
+            period (str): One of PERIODS: 'snapshot', 'day', 'month' or 'year'.
+            since (str): Earliest timestamp (or prefix), included.
+            until (str): Latest timestamp (or prefix), included.
+
+        Returns:
+            list: Dicts with the keys period, category, snapshots (in the period), books and stock
+            (number of books and total number available, averaged over the snapshots), and
+            average_price, min_price and max_price (prices including tax).
+        """
+        where, parameters = _time_range(since, until)
+        if category is not None:
+            where += ' AND category = ?'
+            parameters.append(category)
+        return self._query(
+            f'SELECT substr(scraped_at, 1, {PERIODS[period]}) AS period, category, COUNT(*) AS snapshots, '
+            'CAST(ROUND(AVG(books)) AS INTEGER) AS books, ROUND(SUM(price_sum) / SUM(books), 2) AS average_price, '
+            'MIN(min_price) AS min_price, MAX(max_price) AS max_price, CAST(ROUND(AVG(stock)) AS INTEGER) AS stock '
+            f'FROM category_snapshots WHERE 1 = 1{where} GROUP BY category, period ORDER BY period, category',
+            parameters,
+        )
+
+    def price_changes(self, since=None, until=None, limit=20):
+        """Returns the books whose price moved the most between their first and last snapshot in the range.
+
+        Args:
+            since (str): Earliest timestamp (or prefix), included.
+            until (str): Latest timestamp (or prefix), included.
+            limit (int): Maximum number of books returned.
+
+        Returns:
+            list: Dicts with the keys universal_product_code, title, category, first_price,
+            last_price and change (last minus first), largest absolute change first.
+        """
+        where, parameters = _time_range(since, until)
+        return self._query(
+            'WITH ranged AS (SELECT * FROM snapshots WHERE 1 = 1' + where + '), '
+            'bounds AS (SELECT universal_product_code, MIN(scraped_at) AS first_at, MAX(scraped_at) AS last_at '
+            'FROM ranged GROUP BY universal_product_code HAVING COUNT(*) > 1) '
+            'SELECT last.universal_product_code, last.title, last.category, first.price_including_tax AS first_price, '
+            'last.price_including_tax AS last_price, ROUND(last.price_including_tax - first.price_including_tax, 2) AS change '
+            'FROM bounds '
+            'JOIN snapshots AS first ON first.universal_product_code = bounds.universal_product_code AND first.scraped_at = bounds.first_at '
+            'JOIN snapshots AS last ON last.universal_product_code = bounds.universal_product_code AND last.scraped_at = bounds.last_at '
+            'WHERE change != 0 ORDER BY ABS(change) DESC LIMIT ?',
+            (*parameters, limit),
+        )
+
+    def snapshots(self):
+        """Returns the timestamps of the snapshots with their number of books, oldest first."""
+        return self._query('SELECT scraped_at, SUM(books) AS books FROM category_snapshots GROUP BY scraped_at ORDER BY scraped_at')
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report."""
+        return f'Price history: {self.added} snapshots added to {self.path}'
+
+
+def _time_range(since, until):
+    """Returns the SQL condition and parameters selecting scraped_at between two timestamps or prefixes, both included."""
+    where, parameters = '', []
+    if since:
+        where += ' AND scraped_at >= ?'
+        parameters.append(since)
+    if until:
+        # A prefix such as '2024-05' includes the whole month
+        where += ' AND scraped_at < ?'
+        parameters.append(until + '~')
+    return where, parameters
+
+
+def _read_rows(path):
+    """Yields the rows of an output file as dicts, according to its extension."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet
+        yield from pyarrow.parquet.read_table(path).to_pylist()
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as rows_file:
+            for line in rows_file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as rows_file:
+            yield from csv.DictReader(rows_file)
+
+
+def _print_rows(rows):
+    if not rows:
+        print('No data.')
+        return
+    columns = list(rows[0])
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main(argv=None):
+    """Queries the price history from the command line: python -m scraper.history <command> ..."""
+    parser = argparse.ArgumentParser(description='Historique des prix et des stocks enregistré par book_scraper.py.')
+    parser.add_argument('--history-file', default='.price_history.sqlite', help="Base SQLite de l'historique.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    book = commands.add_parser('book', help="Historique d'un livre.")
+    book.add_argument('upc', help='universal_product_code du livre.')
+    category = commands.add_parser('category', help='Prix moyen, minimum, maximum et stock par catégorie et par période.')
+    category.add_argument('name', nargs='?', help='Nom de la catégorie. Par défaut, toutes.')
+    category.add_argument('--period', choices=list(PERIODS), default='day', help='Période de regroupement.')
+    changes = commands.add_parser('changes', help='Livres dont le prix a le plus changé.')
+    changes.add_argument('--limit', type=int, default=20, help='Nombre de livres affichés.')
+    commands.add_parser('snapshots', help='Instantanés enregistrés.')
+    import_files = commands.add_parser('import', help="Ajoute à l'historique les fichiers de données déjà produits.")
+    import_files.add_argument('directory', nargs='?', default='datas', help='Dossier des fichiers de données.')
+    for command in (book, category, changes):
+        command.add_argument('--since', help='Date de début incluse, par exemple 2024-05 ou 2024-05-01.')
+        command.add_argument('--until', help='Date de fin incluse.')
+    args = parser.parse_args(argv)
+
+    history = PriceHistory(args.history_file)
+    try:
+        start = time.perf_counter()
+        if args.command == 'book':
+            rows = history.book_history(args.upc, args.since, args.until)
+        elif args.command == 'category':
+            rows = history.category_trend(args.name, args.period, args.since, args.until)
+        elif args.command == 'changes':
+            rows = history.price_changes(args.since, args.until, args.limit)
+        elif args.command == 'snapshots':
+            rows = history.snapshots()
+        else:
+            print(f'✅ {history.import_directory(args.directory)} rows imported from {args.directory}')
+            return
+        elapsed = time.perf_counter() - start
+        _print_rows(rows)
+        print(f'\n{len(rows)} rows in {elapsed * 1000:.1f} ms')
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
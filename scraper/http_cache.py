@@ -0,0 +1,186 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+# mkstemp creates files readable by their owner only: they get the mode open() would give them instead.
+# The umask can only be read by setting it, which is done once, at import, before any thread writes files.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+
+def _atomic_write(path, data):
+    """Writes bytes to path through a temporary file so that readers never see a partial file."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, _FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class HttpCache:
+    """Persistent HTTP cache storing response bodies with their ETag / Last-Modified validators.
+
+    Bodies are stored one file per URL in `directory`; the index (validators, sizes and LRU order)
+    lives in `directory/index.json`. When the total size goes over `max_bytes`, the least recently
+    used entries are evicted.
+
+    Args:
+        directory (str): Directory of the cache. Created if missing.
+        max_bytes (int): Maximum total size of the cached bodies.
+        flush_every (int): Number of stores between two writes of the index, so that a crash
+            loses at most that many entries.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory='.http_cache', max_bytes=512 * 1024 * 1024, flush_every=100):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._stores_since_flush = 0
+        os.makedirs(directory, exist_ok=True)
+        self._entries = self._load_index()
+        self.total_bytes = sum(entry['size'] for entry in self._entries.values())
+        # max_bytes may have been lowered since the previous run
+        self._unlink(self._evict())
+
+    def _load_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        try:
+            with open(path, encoding='utf-8') as index_file:
+                entries = OrderedDict(json.load(index_file))
+        except (OSError, ValueError):
+            return OrderedDict()
+        # Entries whose body file disappeared are useless: a 304 could not be served from them
+        return OrderedDict((url, entry) for url, entry in entries.items() if os.path.exists(self._body_path(entry['key'])))
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def validators(self, url):
+        """Returns the conditional request headers for url (empty if url is not cached).
+
+        Args:
+            url (str): URL about to be requested.
+
+        Returns:
+            dict: If-None-Match and/or If-Modified-Since headers.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidated(self, url):
+        """Returns the cached body of url after a 304 Not Modified response, and counts a hit.
+
+        Args:
+            url (str): URL that answered 304.
+
+        Returns:
+            bytes: Cached body, or None if the entry is gone (the caller must then refetch).
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._body_path(entry['key']), 'rb') as body_file:
+                body = body_file.read()
+        except OSError:
+            self._forget(url)
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(body)
+        return body
+
+    def store(self, url, body, headers):
+        """Stores a 200 response and counts a miss.
+
+        Responses without validators are not cached, since they could never be revalidated.
+
+        Args:
+            url (str): Requested URL.
+            body (bytes): Response body.
+            headers (Mapping): Response headers.
+        """
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        with self._lock:
+            self.misses += 1
+        if not (etag or last_modified) or len(body) > self.max_bytes:
+            return
+
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        _atomic_write(self._body_path(key), body)
+        with self._lock:
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self.total_bytes -= previous['size']
+            self._entries[url] = {'key': key, 'etag': etag, 'last_modified': last_modified, 'size': len(body)}
+            self.total_bytes += len(body)
+            evicted = self._evict()
+            self._stores_since_flush += 1
+            flush = self._stores_since_flush >= self.flush_every
+        self._unlink(evicted)
+        if flush:
+            self.flush()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        evicted = []
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry['size']
+            evicted.append(entry['key'])
+        return evicted
+
+    def _unlink(self, keys):
+        for key in keys:
+            try:
+                os.unlink(self._body_path(key))
+            except OSError:
+                pass
+
+    def _forget(self, url):
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self.total_bytes -= entry['size']
+
+    def flush(self):
+        """Writes the index to disk."""
+        with self._lock:
+            data = json.dumps(list(self._entries.items())).encode('utf-8')
+            self._stores_since_flush = 0
+        _atomic_write(os.path.join(self.directory, self.INDEX_FILE), data)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        """Returns a one-line summary of the cache counters, for the end-of-run report."""
+        return (f'HTTP cache: {self.hits} hits (304), {self.misses} misses, '
+                f'{self.bytes_saved / 1e6:.1f} MB not transferred, {len(self)} entries ({self.total_bytes / 1e6:.1f} MB)')
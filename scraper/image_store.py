@@ -0,0 +1,231 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+from scraper.http_cache import _FILE_MODE, _atomic_write
+
+
+CHUNK_SIZE = 64 * 1024
+
+SAVED = 'saved'
+UNCHANGED = 'unchanged'
+
+
+class ImageStore:
+    """Content-addressed image store with streaming downloads.
+
+    Each distinct image body is stored once under `root/.objects/<xx>/<hash>.jpg`; the per-category
+    paths used in the CSV files are hard links to these objects (or copies where hard links are not
+    supported). A manifest maps every image URL to its object and HTTP validators, so that:
+
+    - an URL is downloaded at most once per run, however many books share it;
+    - later runs send conditional requests and a 304 only (re)creates the link;
+    - identical covers served from different URLs share one object on disk.
+
+    Downloads are streamed in chunks to a temporary file, hashed on the fly and renamed atomically.
+    When `thumbnail_size` is set, a bounded pool of workers writes a resized copy of each new object
+    to `root/.thumbnails/` (requires Pillow).
+
+    Args:
+        root (str): Root directory of the images.
+        thumbnail_size (tuple): (width, height) bounding box of the thumbnails, or None to disable them.
+        thumbnail_workers (int): Number of threads generating thumbnails.
+        flush_every (int): Number of manifest updates between two writes of the manifest.
+    """
+
+    MANIFEST_FILE = '.manifest.json'
+
+    def __init__(self, root='images', thumbnail_size=None, thumbnail_workers=2, flush_every=100):
+        self.root = root
+        self.objects_dir = os.path.join(root, '.objects')
+        self.thumbnails_dir = os.path.join(root, '.thumbnails')
+        self.thumbnail_size = thumbnail_size
+        self.flush_every = flush_every
+        self.counts = {'downloaded': 0, 'not_modified': 0, 'reused': 0, 'deduplicated': 0, 'thumbnails': 0}
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._fetched = set()
+        self._updates_since_flush = 0
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._manifest = self._load_manifest()
+
+        self._thumbnailer = None
+        if thumbnail_size:
+            os.makedirs(self.thumbnails_dir, exist_ok=True)
+            self._thumbnailer = ThreadPoolExecutor(max_workers=thumbnail_workers, thread_name_prefix='thumbnail')
+            # Bounds the number of thumbnails waiting in the pool, so decoded images do not pile up in memory
+            self._thumbnail_slots = threading.BoundedSemaphore(thumbnail_workers * 4)
+
+    @staticmethod
+    def thumbnails_available():
+        """Returns True if Pillow is installed."""
+        return importlib.util.find_spec('PIL') is not None
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, self.MANIFEST_FILE), encoding='utf-8') as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+
+    def object_path(self, digest):
+        """Returns the path of the object whose content hash is digest."""
+        return os.path.join(self.objects_dir, digest[:2], digest + '.jpg')
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def save(self, url, save_path, open_stream):
+        """Makes save_path hold the image at url, downloading it only if needed.
+
+        Args:
+            url (str): Image URL.
+            save_path (str): Path where the image must be available.
+            open_stream (callable): open_stream(url, headers) returns a context manager yielding a
+                streamed requests.Response.
+
+        Raises:
+            requests.RequestException: If the download fails.
+
+        Returns:
+            str: SAVED if save_path was (re)written, UNCHANGED if it already held the image.
+        """
+        # One download per URL: the other books sharing the cover wait for it and reuse the object
+        with self._url_lock(url):
+            with self._lock:
+                entry = self._manifest.get(url)
+                fetched = url in self._fetched
+            object_path = self.object_path(entry['hash']) if entry else None
+            if entry and not os.path.exists(object_path):
+                entry = object_path = None
+
+            if entry and fetched:
+                self._count('reused')
+            else:
+                object_path = self._download(url, entry, open_stream)
+        return self._link(object_path, save_path)
+
+    def _download(self, url, entry, open_stream):
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with open_stream(url, headers) as response:
+            if response.status_code == 304 and entry:
+                with self._lock:
+                    self._fetched.add(url)
+                self._count('not_modified')
+                return self.object_path(entry['hash'])
+            response.raise_for_status()
+
+            digest = hashlib.blake2b(digest_size=16)
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as tmp_file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        tmp_file.write(chunk)
+                        size += len(chunk)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+        digest = digest.hexdigest()
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            os.unlink(tmp_path)
+            self._count('deduplicated')
+            new_object = False
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # The per-category paths are hard links to the object: they share its mode
+            os.chmod(tmp_path, _FILE_MODE)
+            os.replace(tmp_path, object_path)
+            new_object = True
+
+        with self._lock:
+            self._manifest[url] = {'hash': digest, 'etag': etag, 'last_modified': last_modified}
+            self._fetched.add(url)
+            self.counts['downloaded'] += 1
+            self.bytes_downloaded += size
+            self._updates_since_flush += 1
+            flush = self._updates_since_flush >= self.flush_every
+        if flush:
+            self.flush()
+        if new_object and self._thumbnailer is not None:
+            self._thumbnail_slots.acquire()
+            self._thumbnailer.submit(self._make_thumbnail, object_path, digest)
+        return object_path
+
+    def _link(self, object_path, save_path):
+        """Points save_path at the object, atomically, unless it already does."""
+        if os.path.exists(save_path) and os.path.samefile(object_path, save_path):
+            return UNCHANGED
+        directory = os.path.dirname(save_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f'.tmp-{os.getpid()}-{threading.get_ident()}-{os.path.basename(save_path)}')
+        try:
+            os.link(object_path, tmp_path)
+        except OSError:
+            # File systems without hard links (or across devices): fall back to a copy
+            shutil.copyfile(object_path, tmp_path)
+        os.replace(tmp_path, save_path)
+        return SAVED
+
+    def _make_thumbnail(self, object_path, digest):
+        try:
+            from PIL import Image
+
+            width, height = self.thumbnail_size
+            with Image.open(object_path) as image:
+                image.thumbnail((width, height))
+                thumbnail_path = os.path.join(self.thumbnails_dir, f'{digest}_{width}x{height}.jpg')
+                image.convert('RGB').save(thumbnail_path + '.tmp', 'JPEG')
+            os.replace(thumbnail_path + '.tmp', thumbnail_path)
+            self._count('thumbnails')
+        except Exception as e:
+            print(f'❌ Failed to create thumbnail for {object_path}: {e}')
+        finally:
+            self._thumbnail_slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def flush(self):
+        """Writes the manifest to disk."""
+        with self._lock:
+            data = json.dumps(self._manifest).encode('utf-8')
+            self._updates_since_flush = 0
+        _atomic_write(os.path.join(self.root, self.MANIFEST_FILE), data)
+
+    def close(self):
+        """Waits for the pending thumbnails and writes the manifest."""
+        if self._thumbnailer is not None:
+            self._thumbnailer.shutdown(wait=True)
+        self.flush()
+
+    def disk_usage(self):
+        """Returns the total size in bytes of the stored objects."""
+        total = 0
+        for directory, _, filenames in os.walk(self.objects_dir):
+            total += sum(os.path.getsize(os.path.join(directory, filename)) for filename in filenames)
+        return total
+
+    def summary(self):
+        """Returns a one-line summary of the image phase, for the end-of-run report."""
+        return (f"Images: {self.counts['downloaded']} downloaded ({self.bytes_downloaded / 1e6:.1f} MB), "
+                f"{self.counts['not_modified']} not modified, {self.counts['reused']} shared, "
+                f"{self.counts['deduplicated']} duplicates, {self.disk_usage() / 1e6:.1f} MB stored"
+                + (f", {self.counts['thumbnails']} thumbnails" if self.thumbnail_size else ''))
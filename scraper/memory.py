@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+import sys
+import threading
+import time
+
+
+def peak_rss():
+    """Returns the peak resident set size of the current process in bytes, or None if it cannot be measured.
+
+    The resource module only exists on Unix; on Windows the peak is not reported.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class ByteBudget:
+    """Global cap on the bytes of downloaded pages held in memory until they are parsed.
+
+    A page is reserved before it is requested, for the average size of the pages read so far
+    (acquire_estimate), adjusted to its real size once its body has arrived (resize), and released
+    once its record is extracted. While the pages already held would exceed max_bytes, the
+    reservation blocks, so that the threads that download pages wait, without holding a body or a
+    connection, until the parsers catch up. A page larger than the whole budget is
+    admitted alone, so that it cannot block the crawl forever.
+
+    Without max_bytes nothing blocks, but the peak of the bytes held is still measured.
+
+    Args:
+        max_bytes (int): Maximum bytes held at once, or None for no limit.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.held = 0
+        self.peak = 0
+        self.waits = 0
+        self.waited = 0.0
+        self._sizes = 0
+        self._count = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        """Holds size bytes, waiting while they do not fit in the budget.
+
+        Args:
+            size (int): Size of the page body, in bytes.
+
+        Returns:
+            float: Time waited, in seconds.
+        """
+        return self._acquire(lambda: size)[1]
+
+    def acquire_estimate(self):
+        """Holds the expected size of the next page, waiting while it does not fit in the budget.
+
+        The estimate is the average size of the pages resized so far. Until one is known, it is the
+        whole budget, so that the first page is requested alone instead of every thread at once. It
+        is computed again each time the thread wakes up.
+
+        Returns:
+            int: Bytes held, to pass to resize once the real size is known.
+        """
+        return self._acquire(lambda: self._sizes // self._count if self._count else self.max_bytes or 0)[0]
+
+    def _acquire(self, estimate):
+        with self._condition:
+            start = time.monotonic()
+            size = estimate()
+            if self.max_bytes and self.held and self.held + size > self.max_bytes:
+                self.waits += 1
+                while self.held and self.held + size > self.max_bytes:
+                    self._condition.wait()
+                    size = estimate()
+            waited = time.monotonic() - start
+            self.waited += waited
+            self.held += size
+            self.peak = max(self.peak, self.held)
+            return size, waited
+
+    def resize(self, held, size):
+        """Replaces held bytes acquired earlier by size bytes, without waiting.
+
+        Used once a page reserved with an estimate of `held` bytes has been read: a larger body is
+        admitted anyway, since waiting while holding bytes could block every holder at once.
+        """
+        with self._condition:
+            if size:
+                self._sizes += size
+                self._count += 1
+            self.held += size - held
+            self.peak = max(self.peak, self.held)
+            if size < held:
+                self._condition.notify_all()
+
+    def release(self, size):
+        """Gives back size bytes acquired earlier."""
+        with self._condition:
+            self.held -= size
+            self._condition.notify_all()
+
+    @contextmanager
+    def hold(self, size):
+        """Holds size bytes for the duration of the with-block."""
+        self.acquire(size)
+        try:
+            yield
+        finally:
+            self.release(size)
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report, with the peak RSS of the process."""
+        rss = peak_rss()
+        cap = f' (cap {self.max_bytes / 1e6:.2f} MB, {self.waits} waits, {self.waited:.2f}s waited)' if self.max_bytes else ''
+        return ((f'Memory: peak RSS {rss / 1e6:.1f} MB, ' if rss is not None else 'Memory: ')
+                + f'pages held up to {self.peak / 1e6:.2f} MB{cap}')
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+import json
+import math
+import threading
+import time
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantile(sorted_values, q):
+    """Returns the q-quantile of an already sorted list (nearest-rank method)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms for one crawl.
+
+    Counters are plain totals (requests, bytes, errors...). Histograms keep every observation of a
+    run, which is a few thousand floats for a full crawl, so quantiles are exact.
+
+    Args:
+        prefix (str): Prefix of the metric names in the Prometheus export.
+    """
+
+    def __init__(self, prefix='bookscraper'):
+        self.prefix = prefix
+        self.started = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1):
+        """Adds value to the counter name."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Records one observation in the histogram name."""
+        with self._lock:
+            self._histograms.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Times the with-block into the histogram name (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def to_dict(self):
+        """Returns the counters and a summary of each histogram (count, sum, mean, p50, p95, p99, max)."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: sorted(values) for name, values in self._histograms.items()}
+        summaries = {}
+        for name, values in histograms.items():
+            total = sum(values)
+            summaries[name] = {
+                'count': len(values),
+                'sum': total,
+                'mean': total / len(values),
+                **{f'p{round(q * 100)}': quantile(values, q) for q in QUANTILES},
+                'max': values[-1],
+            }
+        return {'started': self.started, 'duration': time.time() - self.started, 'counters': counters, 'histograms': summaries}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format (histograms as summaries)."""
+        data = self.to_dict()
+        lines = []
+        for name, value in sorted(data['counters'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+        for name, summary in sorted(data['histograms'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} summary')
+            lines += [f'{metric}{{quantile="{q}"}} {summary[f"p{round(q * 100)}"]:.6f}' for q in QUANTILES]
+            lines += [f'{metric}_sum {summary["sum"]:.6f}', f'{metric}_count {summary["count"]}']
+        lines += [f'# TYPE {self.prefix}_run_duration_seconds gauge', f'{self.prefix}_run_duration_seconds {data["duration"]:.3f}']
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """Writes the metrics to path: Prometheus text if it ends with .prom or .txt, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(text)
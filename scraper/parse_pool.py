@@ -0,0 +1,71 @@
+import time
+from scraper.book_details_scraper.product_page import BookRecord, book_fields, parse_product_page
+
+
+# Options of the worker process, set once by _init_worker instead of being pickled with every page
+_worker_options = {}
+
+
+def extract_record(content, base_url, parser):
+    """Parses a product page and normalises its fields.
+
+    Args:
+        content (bytes): Raw HTML of the product page.
+        base_url (str): Base URL used to rebuild the absolute image URL.
+        parser (str): One of PARSERS, or None for the default.
+
+    Raises:
+        KeyError: If a field of the product information table is missing.
+
+    Returns:
+        tuple: The BookRecord, and the extraction and normalisation times in seconds.
+    """
+    start = time.perf_counter()
+    fields = book_fields(parse_product_page(content, base_url, parser))
+    extracted = time.perf_counter()
+    record = BookRecord.from_fields(fields)
+    return record, extracted - start, time.perf_counter() - extracted
+
+
+def _init_worker(base_url, parser):
+    _worker_options.update(base_url=base_url, parser=parser)
+
+
+def _extract_in_worker(content):
+    return extract_record(content, **_worker_options)
+
+
+class ParsePool:
+    """Pool of processes running extract_record, so that HTML parsing is not serialised by the GIL.
+
+    Only the raw page bytes go to the workers and only the small BookRecord comes back;
+    the fetching threads block on the result while the other threads keep downloading.
+
+    Processes are started with 'spawn': the crawl is multi-threaded, and forking a process whose
+    other threads hold locks can deadlock the child.
+
+    Args:
+        processes (int): Number of worker processes.
+        base_url (str): Base URL used to rebuild the absolute image URLs.
+        parser (str): One of PARSERS, or None for the default.
+    """
+
+    def __init__(self, processes, base_url, parser=None):
+        # Only needed when a pool is created: extract_record alone does not load multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+
+        self.processes = max(1, processes)
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker, initargs=(base_url, parser))
+
+    def submit(self, content):
+        """Queues a page for extraction and returns a Future of extract_record's result."""
+        return self._executor.submit(_extract_in_worker, content)
+
+    def extract(self, content):
+        """Same as extract_record, run in a worker process."""
+        return self.submit(content).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,316 @@
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+from scraper.book_details_scraper.product_page import BookRecord
+
+
+# Sentinel pushed once per downstream worker when a stage has drained its input
+_DONE = object()
+
+
+@dataclass
+class BookTask:
+    """A book travelling through the pipeline, from its URL to its CSV row."""
+    category_name: str
+    index: int
+    url: str
+    content: bytes = None
+    book_data: BookRecord = None
+    change: str = None
+    resumed: bool = False
+    failed: bool = False
+
+
+@dataclass
+class CategoryListed:
+    """Marker sent after the last book of a category, once all its listing pages have been read."""
+    category_name: str
+    count: int
+
+
+@dataclass
+class CategoryOutput:
+    """Output file of a category being written, with the books waiting for their turn."""
+    sink: object
+    next_index: int = 0
+    waiting: dict = field(default_factory=dict)
+    expected: int = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters of a pipeline stage."""
+    name: str
+    workers: int
+    items: int = 0
+    busy_time: float = 0.0
+    blocked_time: float = 0.0
+    started: float = None
+    finished: float = None
+
+    @property
+    def throughput(self):
+        """Items processed per second of stage wall time (first item started to last item done)."""
+        if not self.items or self.started is None or self.finished is None:
+            return 0.0
+        return self.items / max(self.finished - self.started, 1e-9)
+
+
+class Stage:
+    """A pool of threads reading from an inbox queue and writing to the next stage's inbox.
+
+    `func` receives one item and returns an iterable of items for the next stage; a generator
+    lets a stage pass items on while it is still producing them. `put` on a bounded inbox blocks
+    when the next stage falls behind, which is what applies backpressure; the time spent blocked
+    is reported as `blocked_time`. CategoryListed markers are passed on without calling `func`,
+    except by the last stage.
+
+    `on_drained`, if given, is called by the last worker once the inbox is exhausted; the items it
+    returns are sent downstream before the end-of-stream sentinels. A generator sends each item on
+    as soon as it is produced.
+    """
+
+    def __init__(self, name, func, workers, queue_size, on_drained=None):
+        self.name = name
+        self.func = func
+        self.on_drained = on_drained
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.downstream = None
+        self.stats = StageStats(name, self.workers)
+        self._lock = threading.Lock()
+        self._running = self.workers
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            with self._lock:
+                if self.stats.started is None:
+                    self.stats.started = start
+            passed_on = isinstance(item, CategoryListed) and self.downstream is not None
+            outputs = iter([item]) if passed_on else self._outputs(item)
+            busy = blocked = 0.0
+            while True:
+                step = time.perf_counter()
+                output = next(outputs, _DONE)
+                busy += time.perf_counter() - step
+                if output is _DONE:
+                    break
+                step = time.perf_counter()
+                if self.downstream is not None:
+                    self.downstream.inbox.put(output)
+                blocked += time.perf_counter() - step
+
+            with self._lock:
+                self.stats.items += 1
+                self.stats.busy_time += busy
+                self.stats.blocked_time += blocked
+                self.stats.finished = time.perf_counter()
+
+        with self._lock:
+            self._running -= 1
+            last_worker = self._running == 0
+        if last_worker and self.on_drained is not None:
+            for output in self.on_drained():
+                if self.downstream is not None:
+                    self.downstream.inbox.put(output)
+        if last_worker and self.downstream is not None:
+            for _ in range(self.downstream.workers):
+                self.downstream.inbox.put(_DONE)
+
+    def _outputs(self, item):
+        try:
+            yield from self.func(item)
+        except Exception as e:
+            print(f'❌ {self.name} stage failed on {item}: {e}')
+            # A failed book still goes downstream so that the writer can complete its category
+            if isinstance(item, BookTask):
+                item.failed, item.content = True, None
+                yield item
+
+
+class CategoryPipeline:
+    """Producer/consumer pipeline scraping every category with overlapping stages.
+
+    Stages: listing discovery -> product page fetch -> parse & normalise -> image download -> CSV write.
+    Book URLs are passed on as soon as their listing page arrives, and listing pages of the next
+    category are discovered while product pages of the current one are still downloading. Each stage has its own worker count and a bounded inbox. Product pages and
+    images that still fail after the scheduler's retries are requeued and downloaded once more when
+    their stage has drained its inbox.
+
+    A page is held in the scraper's memory budget (ByteBudget) from before its body is read until it
+    is parsed, so that fetch workers wait instead of piling pages up in the parse inbox when the
+    budget is full.
+
+    Args:
+        scraper (BookScraper): Scraper providing the fetch, extraction, image and CSV methods.
+        listing_workers (int): Number of categories paginated concurrently.
+        fetch_workers (int): Number of product pages downloaded concurrently.
+        parse_workers (int): Number of threads parsing product pages.
+        image_workers (int): Number of images downloaded concurrently.
+        queue_size (int): Capacity of every inter-stage queue.
+    """
+
+    def __init__(self, scraper, listing_workers=2, fetch_workers=8, parse_workers=2, image_workers=8, queue_size=64):
+        self.scraper = scraper
+        # Only touched by the writer thread
+        self._outputs = {}
+        self._started = {}
+        self._results = {}
+        self._requeued = []
+        self._state_lock = threading.Lock()
+
+        self.stages = [
+            Stage('listing', self._discover, listing_workers, queue_size),
+            Stage('fetch', self._fetch, fetch_workers, queue_size, on_drained=self._retry_requeued),
+            Stage('parse', self._parse, parse_workers, queue_size),
+            Stage('image', self._download_image, image_workers, queue_size, on_drained=self._retry_failed_images),
+            # One writer only: it owns the per-category buffers
+            Stage('write', self._write, 1, queue_size),
+        ]
+        for stage, downstream in zip(self.stages, self.stages[1:]):
+            stage.downstream = downstream
+
+    def _discover(self, category):
+        category_name, category_url = category
+        if self.scraper.category_done(category_name):
+            print(f'⏭️  {category_name} already saved by the resumed run. Skipping...')
+            return
+        with self._state_lock:
+            self._started[category_name] = time.time()
+        print(f'🎣 Scraping category: {category_name}')
+        count = 0
+        try:
+            for url in self.scraper.iter_category_books(category_name, category_url):
+                yield BookTask(category_name, count, url)
+                count += 1
+        except Exception as e:
+            print(f'❌ Listing of {category_name} failed: {e}')
+        print(f'📚 Number of books found for {category_name}: {count}')
+        if not count:
+            print(f'❗ No books found for {category_name}. Skipping...')
+            return
+        # The writer closes the category once it has written this many books
+        yield CategoryListed(category_name, count)
+
+    def _fetch(self, task):
+        if self.scraper.frontier is not None:
+            result = self.scraper.frontier.completed(task.url)
+            if result is not None:
+                task.book_data, task.change = result
+                task.resumed = True
+                return [task]
+        # Held in the memory budget from before its body is read until it is parsed
+        task.content = self.scraper._fetch(task.url, hold=True)
+        if task.content is None:
+            print(f'❌ Failed to retrieve book data from {task.url}')
+            # Retried once the other pages are fetched, when the host has had time to recover
+            with self._state_lock:
+                self._requeued.append(task)
+            return []
+        return [task]
+
+    def _retry_requeued(self):
+        with self._state_lock:
+            tasks, self._requeued = self._requeued, []
+        for task in tasks:
+            self.scraper.metrics.inc('books_requeued_total')
+            print(f'🔁 Retrying {task.url}')
+            task.content = self.scraper._fetch(task.url, hold=True)
+            task.failed = task.content is None
+            # Passed on before the next page is held: only the parse stage releases the budget
+            yield task
+
+    def _parse(self, task):
+        if not task.failed and not task.resumed:
+            try:
+                task.book_data, task.change = self.scraper._book_from_content(task.content, task.url, task.category_name)
+            finally:
+                self.scraper.memory.release(len(task.content))
+            task.failed = task.book_data is None
+        # The raw page is no longer needed once the record is extracted
+        task.content = None
+        return [task]
+
+    def _download_image(self, task):
+        if not task.failed and not task.resumed and self.scraper._image_needed(task.book_data.image_path):
+            self.scraper.download_image(task.book_data.image_url, task.book_data.image_path)
+        return [task]
+
+    def _retry_failed_images(self):
+        self.scraper.retry_failed_images()
+        return []
+
+    def _write(self, item):
+        category_name = item.category_name
+        output = self._outputs.get(category_name)
+        if output is None:
+            output = self._outputs[category_name] = CategoryOutput(self.scraper.open_sink(category_name))
+
+        if isinstance(item, CategoryListed):
+            # The marker can overtake the last books of the category in the concurrent stages
+            output.expected = item.count
+        else:
+            # Rows are streamed in listing order, as in the sequential mode: out-of-order books wait for their predecessors
+            if self.scraper.frontier is not None and not item.resumed:
+                self.scraper.frontier.mark_book(item.url, None if item.failed else item.book_data, item.change)
+            output.waiting[item.index] = item
+            while output.next_index in output.waiting:
+                ready = output.waiting.pop(output.next_index)
+                if not ready.failed:
+                    self.scraper.record_history(ready.book_data)
+                    self.scraper.write_row(output.sink, self.scraper.row_to_save(ready.book_data, ready.change))
+                output.next_index += 1
+        expected = output.expected
+        if expected is None or output.next_index < expected:
+            return []
+
+        del self._outputs[category_name]
+        self.scraper.close_sink(output.sink, category_name)
+        elapsed_time = time.time() - self._started[category_name]
+        print(f'📚 {category_name} category processing done in {elapsed_time:.2f} seconds\n')
+        self._results[category_name] = (expected, elapsed_time)
+        return []
+
+    def run(self, category_urls):
+        """Scrapes and saves every category.
+
+        Args:
+            category_urls (dict): Category names and URLs, as returned by get_all_categories_urls.
+
+        Returns:
+            dict: Category name -> (number of books, seconds from listing start to CSV written),
+            in the order of category_urls. Categories without books are left out.
+        """
+        for stage in self.stages:
+            stage.start()
+
+        first_stage = self.stages[0]
+        for category in category_urls.items():
+            first_stage.inbox.put(category)
+        for _ in range(first_stage.workers):
+            first_stage.inbox.put(_DONE)
+
+        for stage in self.stages:
+            stage.join()
+        return {name: self._results[name] for name in category_urls if name in self._results}
+
+    @property
+    def stage_stats(self):
+        """Returns the StageStats of every stage, in pipeline order."""
+        return [stage.stats for stage in self.stages]
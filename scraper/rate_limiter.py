@@ -0,0 +1,305 @@
+from contextlib import contextmanager
+import heapq
+import itertools
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+
+
+# Answers worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Priorities of RequestScheduler.priority: waiting requests are served by priority, then in arrival order
+URGENT = 0
+NORMAL = 1
+
+
+class _Waiters:
+    """Queue of the threads waiting on a condition, served by priority, then in arrival order."""
+
+    def __init__(self):
+        self._heap = []
+        self._tickets = itertools.count()
+
+    def join(self, priority):
+        """Queues the current thread and returns its ticket."""
+        ticket = (priority, next(self._tickets))
+        heapq.heappush(self._heap, ticket)
+        return ticket
+
+    def first(self, ticket):
+        """Tells whether ticket is the next one to be served."""
+        return self._heap[0] == ticket
+
+    def leave(self, ticket):
+        """Removes ticket from the queue (served, or interrupted while waiting)."""
+        if self._heap[0] == ticket:
+            heapq.heappop(self._heap)
+        else:
+            self._heap.remove(ticket)
+            heapq.heapify(self._heap)
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second on average, with bursts of up to `burst`.
+
+    Args:
+        rate (float): Tokens added per second, or None for no limit.
+        burst (int): Capacity of the bucket.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._waiters = _Waiters()
+
+    def acquire(self, priority=NORMAL):
+        """Takes one token, waiting until one is available and no more urgent request is waiting.
+
+        Args:
+            priority (int): URGENT or NORMAL.
+
+        Returns:
+            float: Time waited, in seconds.
+        """
+        if not self.rate:
+            return 0.0
+        start = time.monotonic()
+        with self._condition:
+            ticket = self._waiters.join(priority)
+            # The request waiting for the next token may no longer be the first in line
+            self._condition.notify_all()
+            try:
+                while True:
+                    delay = None
+                    if self._waiters.first(ticket):
+                        now = time.monotonic()
+                        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                        self._updated = now
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return time.monotonic() - start
+                        delay = (1 - self._tokens) / self.rate
+                    self._condition.wait(delay)
+            finally:
+                self._waiters.leave(ticket)
+                self._condition.notify_all()
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted by AIMD (additive increase, multiplicative decrease).
+
+    Each successful request with a normal latency raises the limit by 1/limit, i.e. by about one
+    slot per round of requests. An error, or a smoothed latency above `latency_factor` times the
+    best latency seen recently (and at least `min_latency_increase` above it, so that jitter on a
+    fast network is not mistaken for congestion), halves it. The limit is cut at most once per
+    smoothed latency, so that one burst of failures counts as a single congestion signal.
+
+    Args:
+        maximum (int): Upper bound (and initial value) of the limit.
+        minimum (int): Lower bound of the limit.
+        latency_factor (float): Latency increase, relative to the baseline, treated as congestion.
+        min_latency_increase (float): Smallest latency increase treated as congestion, in seconds.
+        decrease_factor (float): Factor applied to the limit on congestion.
+    """
+
+    def __init__(self, maximum, minimum=1, latency_factor=3.0, min_latency_increase=0.1, decrease_factor=0.5):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.latency_factor = latency_factor
+        self.min_latency_increase = min_latency_increase
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.maximum)
+        self.lowest_limit = self.limit
+        self.decreases = 0
+        self.in_flight = 0
+        self._baseline = None
+        self._smoothed = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._waiters = _Waiters()
+
+    def acquire(self, priority=NORMAL):
+        """Waits for a free slot under the current limit, after the waiting requests of a more urgent priority.
+
+        Args:
+            priority (int): URGENT or NORMAL.
+        """
+        with self._condition:
+            ticket = self._waiters.join(priority)
+            try:
+                while self.in_flight >= int(self.limit) or not self._waiters.first(ticket):
+                    self._condition.wait()
+                self.in_flight += 1
+            finally:
+                self._waiters.leave(ticket)
+                # The next in line may fit under the limit too
+                self._condition.notify_all()
+
+    def release(self, latency, ok):
+        """Frees a slot and adapts the limit to the outcome of the request.
+
+        Args:
+            latency (float): Duration of the request, in seconds.
+            ok (bool): False if the request failed or was throttled by the server.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            congested = not ok
+            if ok:
+                self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+                # The baseline follows the best latency, and slowly forgets it if the network gets slower for good
+                self._baseline = latency if self._baseline is None else min(latency, self._baseline * 1.01)
+                congested = self._smoothed > max(self.latency_factor * self._baseline, self._baseline + self.min_latency_increase)
+            now = time.monotonic()
+            if congested:
+                if now - self._last_decrease >= (self._smoothed or 0.0):
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self.lowest_limit = min(self.lowest_limit, self.limit)
+                    self.decreases += 1
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RequestScheduler:
+    """Per-host rate limiting, adaptive concurrency and retries for the HTTP requests of a crawl.
+
+    Every request to a host takes a token from the host's TokenBucket and a slot from its
+    AdaptiveLimiter. Connection errors, timeouts and RETRY_STATUSES answers are retried up to
+    `retries` times, after an exponential backoff with full jitter (or the server's Retry-After).
+
+    Requests wait for their token and their slot by priority: those sent by a thread inside a
+    `priority(URGENT)` block go ahead of every NORMAL request waiting for the same host, for
+    example a targeted refresh running alongside a full crawl.
+
+    Args:
+        max_concurrency (int): Maximum number of concurrent requests per host.
+        rate (float): Maximum requests per second per host, or None for no limit.
+        burst (int): Requests allowed at once above the rate. Defaults to max_concurrency.
+        retries (int): Number of retries of a failed request.
+        backoff (float): Base delay of the exponential backoff, in seconds.
+        max_backoff (float): Maximum delay between two attempts, in seconds.
+        timeout (float): Connect and read timeout of every request, in seconds.
+        metrics (Metrics): Receives the retry counters. Optional.
+    """
+
+    def __init__(self, max_concurrency=10, rate=None, burst=None, retries=3, backoff=0.5, max_backoff=30.0, timeout=30.0, metrics=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self.burst = burst or self.max_concurrency
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.metrics = metrics
+        self.retried = 0
+        self.gave_up = 0
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (TokenBucket(self.rate, self.burst), AdaptiveLimiter(self.max_concurrency))
+            return self._hosts[host]
+
+    def limiter(self, url):
+        """Returns the AdaptiveLimiter of the URL's host."""
+        return self._host(url)[1]
+
+    @contextmanager
+    def priority(self, priority):
+        """Gives the requests sent by the current thread inside the with-block the given priority.
+
+        Args:
+            priority (int): URGENT or NORMAL.
+        """
+        previous = getattr(self._local, 'priority', NORMAL)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def delay(self, attempt, response=None):
+        """Returns the delay before retry number attempt (0-based): Retry-After if the server sent one, else full jitter."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, int(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _inc(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        if self.metrics is not None:
+            self.metrics.inc(f'http_{name}_total')
+
+    @contextmanager
+    def request(self, url, send):
+        """Sends a request with rate limiting, adaptive concurrency and retries.
+
+        The host's slot is held until the with-block exits, so that streamed bodies count against
+        the concurrency limit while they are read.
+
+        Args:
+            url (str): URL of the request, used to find its host.
+            send (callable): send(timeout) sends the request and returns a requests.Response.
+
+        Raises:
+            requests.RequestException: If the last attempt fails with a connection error, a timeout or a
+                truncated body, or at once for any other error of send (invalid URL, too many redirects...).
+
+        Yields:
+            requests.Response: Response of the last attempt (possibly an error status once retries are exhausted).
+        """
+        bucket, limiter = self._host(url)
+        priority = getattr(self._local, 'priority', NORMAL)
+        attempt = 0
+        while True:
+            bucket.acquire(priority)
+            limiter.acquire(priority)
+            start = time.monotonic()
+            try:
+                response = send(self.timeout)
+            except BaseException as e:
+                # Whatever send raises, the host's slot is given back: a leaked slot would block the host for good
+                limiter.release(time.monotonic() - start, ok=False)
+                if not isinstance(e, RETRY_EXCEPTIONS):
+                    raise
+                if attempt >= self.retries:
+                    self._inc('gave_up')
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    if response.status_code in RETRY_STATUSES:
+                        self._inc('gave_up')
+                    try:
+                        yield response
+                    finally:
+                        limiter.release(time.monotonic() - start, ok=response.status_code not in RETRY_STATUSES)
+                    return
+                response.close()
+                limiter.release(time.monotonic() - start, ok=False)
+            self._inc('retried')
+            time.sleep(self.delay(attempt, response))
+            attempt += 1
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report."""
+        with self._lock:
+            limiters = [limiter for _, limiter in self._hosts.values()]
+        lowest = min((limiter.lowest_limit for limiter in limiters), default=self.max_concurrency)
+        return (f'Requests: {self.retried} retries, {self.gave_up} given up, '
+                f'concurrency limit {int(lowest)}-{self.max_concurrency} per host'
+                + (f', {self.rate:g} req/s' if self.rate else ''))
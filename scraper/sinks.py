@@ -0,0 +1,156 @@
+import csv
+import importlib.util
+import json
+import os
+
+
+class BookSink:
+    """Streaming writer for book rows.
+
+    Rows are buffered and appended to `path + '.part'` every `batch_size` rows, so a crash loses
+    at most one batch. close() renames the part file to `path` atomically, so `path` only ever
+    holds a complete output. No file is created if no row is written.
+
+    Args:
+        path (str): Final path of the output file.
+        batch_size (int): Number of rows buffered between two writes.
+    """
+
+    extension = None
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.part_path = path + '.part'
+        self.batch_size = max(1, batch_size)
+        self.rows_written = 0
+        self._buffer = []
+        self._opened = False
+
+    def write(self, row):
+        """Appends a row (dict). All rows must have the keys of the first one."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to the part file."""
+        if not self._buffer:
+            return
+        if not self._opened:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._open(self._buffer[0])
+            self._opened = True
+        self._write_batch(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        """Flushes the remaining rows and moves the part file to its final path.
+
+        Returns:
+            str: Path of the written file, or None if no row was written.
+        """
+        self.flush()
+        if not self._opened:
+            return None
+        self._close()
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self):
+        """Closes the sink without finalizing it; the part file is left for inspection."""
+        if self._opened:
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _open(self, first_row):
+        raise NotImplementedError
+
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(BookSink):
+    """CSV sink, formatted like DataFrame.to_csv(index=False)."""
+
+    extension = 'csv'
+
+    def _open(self, first_row):
+        self._file = open(self.part_path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=list(first_row), lineterminator=os.linesep)
+        self._writer.writeheader()
+
+    def _write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonLinesSink(BookSink):
+    """JSON Lines sink: one JSON object per line."""
+
+    extension = 'jsonl'
+
+    def _open(self, first_row):
+        self._file = open(self.part_path, 'w', encoding='utf-8')
+
+    def _write_batch(self, rows):
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(BookSink):
+    """Parquet sink writing one row group per batch. Requires pyarrow.
+
+    The schema is declared rather than inferred from the first row, where a None value would give a
+    column the null type and a 'No rating found' rating a string type for the whole file. Columns are
+    strings unless listed in COLUMN_TYPES. As in normalize_frame, the rating column stays numeric: an
+    unknown rating is written as a missing value.
+    """
+
+    extension = 'parquet'
+    COLUMN_TYPES = {'review_rating': 'int64', 'price_including_tax': 'float64', 'price_excluding_tax': 'float64',
+                    'number_available': 'int64'}
+
+    def __init__(self, path, batch_size=100):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        super().__init__(path, batch_size)
+
+    @staticmethod
+    def available():
+        """Returns True if pyarrow is installed."""
+        return importlib.util.find_spec('pyarrow') is not None
+
+    def _open(self, first_row):
+        self._schema = self._pa.schema([(name, self._pa.type_for_alias(self.COLUMN_TYPES.get(name, 'string'))) for name in first_row])
+        self._writer = self._pq.ParquetWriter(self.part_path, self._schema)
+
+    def _write_batch(self, rows):
+        if 'review_rating' in self._schema.names:
+            rows = [row if isinstance(row['review_rating'], int) else dict(row, review_rating=None) for row in rows]
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+SINKS = {sink.extension: sink for sink in (CsvSink, ParquetSink, JsonLinesSink)}
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+import os
+import sqlite3
+import time
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, priority, id);
+'''
+
+
+@dataclass
+class Task:
+    """A task of the queue, as leased by a worker or listed by tasks()."""
+    id: int
+    key: str
+    kind: str
+    payload: dict
+    status: str = LEASED
+    attempts: int = 0
+    error: str = None
+
+
+class WorkQueue:
+    """Task queue shared by several processes through a SQLite database, with leases and visibility timeouts.
+
+    A worker leases the next pending task (lowest priority value first, then oldest) for
+    `visibility_timeout` seconds. If it neither completes nor extends its lease in time (the
+    process crashed or hangs), the task becomes visible again and another worker takes it over.
+    A task that fails, or whose lease expires, more than `max_attempts` times is marked FAILED.
+
+    Every state change is a short IMMEDIATE transaction, so any number of processes on the same
+    machine can share the queue. The database must be on a local disk: SQLite locking is not
+    reliable on network file systems.
+
+    Args:
+        path (str): Path of the SQLite database. Created if missing, with its directory.
+        max_attempts (int): Number of leases of a task before it is given up.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two workers cannot lease the same task
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def put(self, key, kind, payload, priority=0):
+        """Adds a task, unless a task with the same key already exists.
+
+        Args:
+            key (str): Unique key of the task, so that a task added again (by a retried parent task) is not duplicated.
+            kind (str): Kind of the task, which tells the worker what to do with it.
+            payload (dict): JSON-serialisable arguments of the task.
+            priority (int): Tasks with a lower value are leased first.
+
+        Returns:
+            bool: True if the task was added.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO tasks (key, kind, payload, priority, updated_at) VALUES (?, ?, ?, ?, ?)',
+                                  (key, kind, json.dumps(payload, ensure_ascii=False), priority, time.time()))
+        return cursor.rowcount == 1
+
+    def lease(self, worker, visibility_timeout):
+        """Leases the next pending task, or a leased task whose lease has expired.
+
+        Args:
+            worker (str): Identifier of the worker.
+            visibility_timeout (float): Duration of the lease, in seconds.
+
+        Returns:
+            Task: The leased task, or None if no task is available right now.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    'SELECT id, key, kind, payload, attempts FROM tasks '
+                    'WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY priority, id LIMIT 1',
+                    (PENDING, LEASED, now)).fetchone()
+                if row is None:
+                    return None
+                task_id, key, kind, payload, attempts = row
+                if attempts >= self.max_attempts:
+                    # Its last lease expired: the worker died or hung on it every time
+                    conn.execute('UPDATE tasks SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                                 (FAILED, 'lease expired', now, task_id))
+                    continue
+                conn.execute('UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = ?, updated_at = ? WHERE id = ?',
+                             (LEASED, worker, now + visibility_timeout, attempts + 1, now, task_id))
+                return Task(task_id, key, kind, json.loads(payload), LEASED, attempts + 1)
+
+    def extend(self, task, worker, visibility_timeout):
+        """Extends the lease of a task still being processed.
+
+        Returns:
+            bool: False if the lease expired and the task was taken over by another worker.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute('UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND worker = ?',
+                                  (time.time() + visibility_timeout, time.time(), task.id, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, task, worker):
+        """Marks a task as done, if worker still holds its lease.
+
+        Returns:
+            bool: False if the task was taken over by another worker, which will complete it instead.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute('UPDATE tasks SET status = ?, lease_expires = NULL, error = NULL, updated_at = ? WHERE id = ? AND status = ? AND worker = ?',
+                                  (DONE, time.time(), task.id, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, task, worker, error):
+        """Gives a task back after an error: it is retried, or marked FAILED after max_attempts attempts.
+
+        Returns:
+            str: New status of the task (PENDING or FAILED), or None if worker no longer held its lease.
+        """
+        status = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self._transaction() as conn:
+            cursor = conn.execute('UPDATE tasks SET status = ?, lease_expires = NULL, error = ?, updated_at = ? WHERE id = ? AND status = ? AND worker = ?',
+                                  (status, error, time.time(), task.id, LEASED, worker))
+        return status if cursor.rowcount == 1 else None
+
+    def unfinished(self):
+        """Returns the number of tasks that are pending or leased."""
+        return self._conn.execute('SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)', (PENDING, LEASED)).fetchone()[0]
+
+    def counts(self):
+        """Returns the number of tasks of each status."""
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        counts.update(self._conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status'))
+        return counts
+
+    def tasks(self, kind):
+        """Returns every task of a kind, in the order they were added.
+
+        Returns:
+            list: Task objects, with their status, attempts and last error.
+        """
+        rows = self._conn.execute('SELECT id, key, kind, payload, status, attempts, error FROM tasks WHERE kind = ? ORDER BY id', (kind,))
+        return [Task(task_id, key, kind, json.loads(payload), status, attempts, error)
+                for task_id, key, kind, payload, status, attempts, error in rows]
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+    def reset(self):
+        """Removes every task."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM tasks')
+
+    def close(self):
+        self._conn.close()
+
+    def summary(self):
+        """Returns a one-line summary for the end-of-run report."""
+        counts = self.counts()
+        return f'Work queue: {counts[DONE]} tasks done, {counts[FAILED]} failed, {counts[PENDING] + counts[LEASED]} unfinished'